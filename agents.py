@@ -38,6 +38,11 @@ except ImportError:
     print("="*60)
     raise
 
+# A word is a run of word characters. Precompiled once; r'\w+' matches the same words as
+# r'\b\w+\b' (a maximal \w run always sits between word boundaries) but skips the
+# boundary checks.
+_WORD_RE = re.compile(r'\w+')
+
 # --- Base Agent Class ---
 
 class BaseAgent(ABC):
@@ -174,7 +179,9 @@ class WordCountAgent(BaseAgent):
     def execute(self, data_inputs, parameters=None):
         """
         Counts words in payload['content'] of each valid Data Item.
-        :param data_inputs: List[Dict] conforming to protocol.DATA_ITEM_STRUCTURE
+        :param data_inputs: List[Dict] conforming to protocol.DATA_ITEM_STRUCTURE, or any
+                            iterable of them (e.g. a connector's iter_data()); items are
+                            counted one at a time, so a stream is never materialized.
         :param parameters: Ignored by this agent.
         :return: Dictionary {'total_words': count, 'items_processed': N, 'items_skipped': M}
         """
@@ -182,11 +189,14 @@ class WordCountAgent(BaseAgent):
         items_processed = 0
         items_skipped = 0
 
-        if not isinstance(data_inputs, list):
-             print(f"Error: WordCountAgent expects a list of data inputs, got {type(data_inputs)}")
-             return {"total_words": 0, "items_processed": 0, "items_skipped": len(data_inputs) if isinstance(data_inputs, list) else 1 , "error": "Invalid input format: Expected list"}
+        if isinstance(data_inputs, (str, bytes, dict)) or not hasattr(data_inputs, '__iter__'):
+             print(f"Error: WordCountAgent expects a list or iterable of data inputs, got {type(data_inputs)}")
+             return {"total_words": 0, "items_processed": 0, "items_skipped": 1, "error": "Invalid input format: Expected list or iterable"}
 
-        print(f"WordCountAgent '{self.agent_id}' executing on {len(data_inputs)} data inputs...")
+        if isinstance(data_inputs, list):
+             print(f"WordCountAgent '{self.agent_id}' executing on {len(data_inputs)} data inputs...")
+        else:
+             print(f"WordCountAgent '{self.agent_id}' executing on streamed data inputs...")
 
         for item in data_inputs:
             # Validate basic structure
@@ -198,8 +208,7 @@ class WordCountAgent(BaseAgent):
             content = item['payload']['content']
             if isinstance(content, str):
                 # Simple word count using regex
-                words = re.findall(r'\b\w+\b', content)
-                count = len(words)
+                count = len(_WORD_RE.findall(content))
                 total_words += count
                 items_processed += 1
                 # Debug print (optional):
@@ -349,7 +358,7 @@ class KeywordExtractAgent(BaseAgent):
             # Check if we successfully got text to process for this item
             if text_to_process is not None and isinstance(text_to_process, str):
                 # Naive keyword extraction: lowercase, split, filter stop words & length
-                words = re.findall(r'\b\w+\b', text_to_process.lower())
+                words = _WORD_RE.findall(text_to_process.lower())
                 potential_keywords = [
                     word for word in words
                     if word not in STOP_WORDS and len(word) >= min_word_length
@@ -0,0 +1,391 @@
+# OmniNexus - connector_imap.py
+# ImapConnector: fetches recent emails over IMAP, with the password kept in the system keyring.
+# Loaded on demand by the connector registry in connectors.py, so imaplib/keyring are
+# only imported when an IMAP connector is actually used.
+
+import logging
+import functools
+import imaplib
+import email
+from email.header import decode_header, make_header
+import socket # For timeout handling
+import ssl # For secure connection
+import re # For cleaning up headers potentially
+import keyring
+
+from connectors import BaseConnector, freeze_schema
+from protocol import create_iso_timestamp, generate_item_id
+
+logger = logging.getLogger("omninexus.connectors.imap")
+
+# Shared by every ImapConnector: the system CA bundle is parsed once per process and
+# the context's session cache lets reconnects (and other accounts) resume TLS sessions.
+_SSL_CONTEXT = ssl.create_default_context()
+
+class ImapConnector(BaseConnector):
+    """
+    Connector for accessing emails via IMAP protocol. (Phase 3 Update)
+    Handles connection, login, and fetching basic header info for recent emails.
+    Retrieves password securely using the system keyring.
+    """
+    DEFAULT_IMAP_PORT_SSL = 993
+    DEFAULT_IMAP_PORT_NONSSL = 143
+    DEFAULT_FETCH_COUNT = 5
+    DEFAULT_BATCH_SIZE = 100 # Messages per UID FETCH round trip
+
+    # Keyring service name format - used to store/retrieve password
+    # We combine the connector type and server address for uniqueness
+    KEYRING_SERVICE_FORMAT = "OmniNexus_IMAP:{server}"
+
+    # Fetch items requested per message (via UID FETCH): the server UID plus the full
+    # message. BODY.PEEK avoids marking messages as read. Kept as bytes so imaplib sends it as-is.
+    _FETCH_COMMAND = b'(UID BODY.PEEK[])'
+    # Extracts the UID from a FETCH response envelope line, e.g. b'12 (UID 4711 BODY[] {2048}'
+    _UID_RE = re.compile(rb'UID (\d+)')
+
+    @classmethod
+    @functools.lru_cache(maxsize=None) # Built once per class; returned read-only
+    def get_config_schema(cls):
+        return freeze_schema({
+            "server": {"type": "string", "required": True, "description": "IMAP server address (e.g., imap.gmail.com)."},
+            "port": {"type": "integer", "required": False, "default": None, "description": f"IMAP server port (defaults: {cls.DEFAULT_IMAP_PORT_SSL} for SSL, {cls.DEFAULT_IMAP_PORT_NONSSL} otherwise)."},
+            "username": {"type": "string", "required": True, "description": "Email account username."},
+            # PASSWORD PARAMETER REMOVED - Will be fetched from keyring
+            "mailbox": {"type": "string", "required": False, "default": "INBOX", "description": "Mailbox/folder to access."},
+            "use_ssl": {"type": "boolean", "required": False, "default": True, "description": "Use SSL/TLS for connection."},
+            "fetch_count": {"type": "integer", "required": False, "default": cls.DEFAULT_FETCH_COUNT, "description": "Number of recent emails to fetch headers for."},
+            "batch_size": {"type": "integer", "required": False, "default": cls.DEFAULT_BATCH_SIZE, "description": "Maximum number of emails requested per IMAP FETCH round trip."},
+        })
+
+    def __init__(self, connector_id, config):
+        """Initializes IMAP connector specific state."""
+        super().__init__(connector_id, config)
+        self.connection = None
+        self._is_connected = False
+        self._selected_mailbox = None
+        # Construct the service name for keyring based on config
+        self._keyring_service_name = self.KEYRING_SERVICE_FORMAT.format(server=self.config.get("server", "UNKNOWN_SERVER"))
+
+    def validate_config(self):
+        """Validates the configuration for ImapConnector."""
+        # Required keys (server, username; the password lives in the keyring), types
+        # and defaults come from the schema
+        self._apply_schema()
+
+        # Port default depends on use_ssl
+        if self.config["port"] is None:
+            self._config['port'] = self.DEFAULT_IMAP_PORT_SSL if self.config["use_ssl"] else self.DEFAULT_IMAP_PORT_NONSSL
+
+        if self.config["fetch_count"] <= 0:
+            raise ValueError("Config 'fetch_count' must be a positive integer.")
+        if self.config["batch_size"] <= 0:
+            raise ValueError("Config 'batch_size' must be a positive integer.")
+
+        logger.debug("IMAP Config basic validation passed.")
+
+
+    def connect(self):
+        """Establishes connection to the IMAP server, logs in (using keyring), and selects mailbox."""
+        if self._is_connected:
+            logger.debug("IMAP connector '%s' already connected to mailbox '%s'.", self.connector_id, self._selected_mailbox)
+            return True
+
+        server = self.config.get("server")
+        port = self.config.get("port")
+        use_ssl = self.config.get("use_ssl")
+        username = self.config.get("username")
+        mailbox = self.config.get("mailbox")
+
+        # === Retrieve password from keyring ===
+        logger.debug("Retrieving password for user '%s' on service '%s' from system keyring...", username, self._keyring_service_name)
+        try:
+            password = keyring.get_password(self._keyring_service_name, username)
+            if password is None:
+                 logger.error(
+                     "Password not found in keyring for service '%s' and username '%s'.\n"
+                     "Please store the password/token using a keyring tool or script.\n"
+                     "Example using keyring CLI (install with 'pip install keyring'):\n"
+                     "  keyring set \"%s\" \"%s\"\n"
+                     "You will be prompted for the password securely.\n"
+                     "See library docs: https://pypi.org/project/keyring/",
+                     self._keyring_service_name, username, self._keyring_service_name, username)
+                 # Optional: Raise specific error? For now, return False from connect.
+                 # raise ValueError("Password not found in keyring")
+                 return False # Indicate connection failure due to missing password
+        except (keyring.errors.KeyringError, OSError) as e:
+             logger.error("Failed to retrieve password from keyring: %s", e)
+             logger.debug("Keyring lookup traceback", exc_info=True)
+             return False # Indicate connection failure
+
+        logger.info("Connecting to IMAP %s:%s (SSL: %s) for user %s...", server, port, use_ssl, username)
+
+        try:
+            # Establish connection
+            if use_ssl:
+                self.connection = imaplib.IMAP4_SSL(server, port, ssl_context=_SSL_CONTEXT)
+            else:
+                self.connection = imaplib.IMAP4(server, port)
+            logger.debug("Connection established.")
+
+            # Login using password from keyring
+            status, messages = self.connection.login(username, password)
+            if status != 'OK':
+                # Avoid printing password in error message
+                error_msg = ' '.join(m.decode() if isinstance(m, bytes) else str(m) for m in messages)
+                raise imaplib.IMAP4.error(f"Login failed: {error_msg}")
+            logger.debug("IMAP login successful.")
+
+            # Select Mailbox (read-only preferred)
+            status, messages = self.connection.select(f'"{mailbox}"', readonly=True)
+            if status != 'OK':
+                 logger.warning("Read-only mailbox selection failed, trying read-write: %s", messages)
+                 status, messages = self.connection.select(f'"{mailbox}"', readonly=False)
+                 if status != 'OK':
+                      raise imaplib.IMAP4.error(f"Mailbox selection failed: {' '.join(m.decode() if isinstance(m, bytes) else str(m) for m in messages)}")
+
+            message_count = int(messages[0]) if messages and messages[0].isdigit() else 'N/A'
+            logger.info("Mailbox '%s' selected successfully (%s messages).", mailbox, message_count)
+            self._selected_mailbox = mailbox
+            self._is_connected = True
+            return True
+
+        # Connection/login/select failures. OSError covers socket.gaierror, socket.timeout
+        # and ssl.SSLError; anything else is a bug and propagates to the caller.
+        except (imaplib.IMAP4.error, OSError) as e:
+            logger.error("Error connecting/logging into IMAP server %s: %s", server, e)
+            logger.debug("IMAP connect traceback", exc_info=True)
+            if self.connection:
+                try: self.connection.shutdown()
+                except OSError: pass
+            self.connection = None
+            self._is_connected = False
+            self._selected_mailbox = None
+            return False
+
+
+    # --- disconnect, get_metadata, _decode_header, query_data methods remain unchanged ---
+    # --- Make sure they are still present below this point ---
+
+    def disconnect(self):
+        # ... (Keep existing implementation) ...
+        if self.connection:
+            logger.info("Disconnecting IMAP connector '%s'...", self.connector_id)
+            try:
+                 if self._selected_mailbox:
+                     try:
+                         self.connection.close()
+                     except imaplib.IMAP4.error as e:
+                         logger.debug("Error closing mailbox (might be ok): %s", e)
+                 try:
+                     status, msg = self.connection.logout()
+                 except Exception as e:
+                      logger.debug("Error during logout (might be ok): %s", e)
+            finally:
+                self.connection = None
+                self._is_connected = False
+                self._selected_mailbox = None
+                logger.info("IMAP connector '%s' disconnected.", self.connector_id)
+        else:
+            self._is_connected = False # Ensure state is correct
+            self._selected_mailbox = None
+
+    def get_metadata(self):
+        # ... (Keep existing implementation) ...
+        status = "disconnected"
+        if self._is_connected and self._selected_mailbox:
+            status = f"connected to '{self._selected_mailbox}'"
+        elif self.connection:
+            status = "connected (no mailbox)"
+
+        return {
+            "connector_id": self.connector_id,
+            "type": "imap",
+            "server": self.config.get("server"),
+            "port": self.config.get("port"),
+            "username": self.config.get("username"),
+            "status": status
+        }
+
+    def _decode_header(self, header_text):
+        # ... (Keep existing implementation) ...
+        if header_text is None: return ""
+        try:
+            decoded_header = make_header(decode_header(str(header_text)))
+            return str(decoded_header)
+        except Exception:
+            try:
+                return str(header_text).encode('raw_unicode_escape').decode('utf-8', 'ignore')
+            except:
+                return str(header_text)
+
+    def _ensure_live(self):
+        """
+        Makes sure the pooled IMAP session is usable before a query.
+
+        An existing session is probed with a cheap NOOP and reused as-is; only when
+        there is no session, or the probe fails, is a full connect() performed
+        (TCP + TLS handshake + LOGIN + SELECT).
+        Returns True if a live, mailbox-selected session is available.
+        """
+        if self._is_connected and self.connection and self._selected_mailbox:
+            try:
+                status, _ = self.connection.noop()
+                if status == 'OK':
+                    return True
+                logger.info("IMAP keepalive for '%s' returned %s; reconnecting.", self.connector_id, status)
+            except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError) as e:
+                logger.info("IMAP keepalive for '%s' failed (%s); reconnecting.", self.connector_id, e)
+            # The session is dead: drop it without a LOGOUT round trip and start over
+            try: self.connection.shutdown()
+            except OSError: pass
+            self.connection = None
+            self._is_connected = False
+            self._selected_mailbox = None
+        return self.connect() and self._is_connected
+
+    def _message_to_item(self, uid, full_message_bytes):
+        """
+        Parses one raw RFC 822 message into a Data Item (headers + plain text body).
+        Raises ValueError/LookupError/TypeError/AttributeError for malformed messages.
+        """
+        body_text = None # Initialize body text for this email
+        # 4. Parse full message using email module
+        msg = email.message_from_bytes(full_message_bytes)
+
+        # Extract common headers
+        subject = self._decode_header(msg['Subject'])
+        sender = self._decode_header(msg['From'])
+        email_date_str = msg['Date']
+        to_header = self._decode_header(msg['To'])
+        cc_header = self._decode_header(msg['Cc'])
+        message_id = msg['Message-ID']
+
+        # 5. Extract plain text body
+        if msg.is_multipart():
+            for part in msg.walk():
+                content_type = part.get_content_type()
+                content_disposition = str(part.get('Content-Disposition'))
+                # Look for plain text parts that are not attachments
+                if content_type == 'text/plain' and 'attachment' not in content_disposition:
+                    try:
+                        # Decode the payload, trying common encodings
+                        charset = part.get_content_charset() if part.get_content_charset() else 'utf-8' # Default to utf-8
+                        payload_bytes = part.get_payload(decode=True) # Decode base64/quoted-printable
+                        body_text = payload_bytes.decode(charset, errors='replace') # Decode charset
+                        break # Found the plain text body, stop looking
+                    except (LookupError, AttributeError) as decode_err: # Unknown charset / empty payload
+                        logger.warning("Could not decode text part for UID %s with charset %s: %s", uid, charset, decode_err)
+                        # Optionally try other charsets as fallback here
+        else:
+            # Not multipart, try to get the payload directly if it's text/plain
+            if msg.get_content_type() == 'text/plain':
+                try:
+                    charset = msg.get_content_charset() if msg.get_content_charset() else 'utf-8'
+                    payload_bytes = msg.get_payload(decode=True)
+                    body_text = payload_bytes.decode(charset, errors='replace')
+                except (LookupError, AttributeError) as decode_err: # Unknown charset / empty payload
+                    logger.warning("Could not decode non-multipart message body for UID %s with charset %s: %s", uid, charset, decode_err)
+
+        # Use subject if body couldn't be extracted (fallback)
+        primary_content = body_text if body_text else subject
+
+        # 6. Construct Data Item
+        item = {
+            "item_id": generate_item_id(),
+            "connector_id": self.connector_id,
+            "source_uri": f"imap://{self.config['username']}@{self.config['server']}/{self._selected_mailbox};UID={uid}",
+            "retrieved_at": create_iso_timestamp(),
+            "metadata": {
+                "type": "message/rfc822", # Indicate it's a full(er) message
+                "uid": uid,
+                "mailbox": self._selected_mailbox,
+                "message_id": message_id, # RFC standard message ID
+                # Add more metadata if needed
+            },
+            "payload": {
+                # Include headers and body
+                "subject": subject,
+                "from": sender,
+                "to": to_header,
+                "cc": cc_header,
+                "date_str": email_date_str,
+                "content": primary_content, # The primary text content for agents
+                "body_text": body_text # Explicitly store the extracted plain text body
+                # Future: Add 'body_html', 'attachments' list etc.
+            }
+        }
+        logger.debug("Processed UID %s: subject=%.50r has_body=%s", uid, subject, body_text is not None)
+        return item
+
+    def query_data(self, query_params=None):
+        """
+        Fetches full emails (headers and plain text body) for recent messages.
+        Returns data structured as standard Data Items.
+        The IMAP session is kept open between calls and reused (see _ensure_live).
+        """
+        if not self._ensure_live():
+            logger.error("IMAP connector '%s' could not establish a session.", self.connector_id)
+            return []
+
+        data_items = []
+        fetch_count = self.config.get('fetch_count', self.DEFAULT_FETCH_COUNT)
+        logger.info("IMAP connector '%s': fetching details for last %d emails...", self.connector_id, fetch_count)
+
+        try:
+            # 1. Search for all message UIDs (UID SEARCH, so results can be used in UID FETCH)
+            status, messages = self.connection.uid('SEARCH', 'ALL')
+            if status != 'OK':
+                logger.error("Error searching mailbox: %s", messages)
+                return []
+
+            if not messages or not messages[0]:
+                logger.info("No messages found in mailbox.")
+                return []
+            uids_bytes = messages[0].split()
+
+            # 2. Get the UIDs for the most recent messages
+            recent_uids = uids_bytes[-fetch_count:]
+            if not recent_uids:
+                logger.info("No UIDs selected for fetching.")
+                return []
+
+            logger.debug("Found %d total emails. Fetching full message for %d UIDs: %s", len(uids_bytes), len(recent_uids), recent_uids)
+
+            # 3. Fetch UID + full message for up to batch_size messages per round trip,
+            # addressing them with a UID set (b'4711,4712,...') instead of one FETCH each
+            batch_size = self.config.get('batch_size', self.DEFAULT_BATCH_SIZE)
+            for start in range(0, len(recent_uids), batch_size):
+                uid_set = b",".join(recent_uids[start:start + batch_size])
+                status, msg_data = self.connection.uid('FETCH', uid_set, self._FETCH_COMMAND)
+                if status != 'OK':
+                    logger.warning("Error fetching messages for UIDs %s: status %s", uid_set, status)
+                    continue
+
+                for part in msg_data:
+                    # Each message arrives as (b'12 (UID 4711 BODY[] {size}', b'Full Message Bytes...')
+                    # followed by a closing b')'; anything that isn't such a tuple is framing.
+                    if not isinstance(part, tuple) or len(part) < 2 or not part[1]:
+                        continue
+                    uid_match = self._UID_RE.search(part[0])
+                    uid = uid_match.group(1).decode() if uid_match else "unknown"
+                    try:
+                        # 4-6. Parse the message and build its Data Item
+                        item = self._message_to_item(uid, part[1])
+                    except (ValueError, LookupError, TypeError, AttributeError) as e_parse:
+                        # A malformed message only skips that UID; IMAP/socket errors abort the
+                        # whole query below since the session is unusable afterwards.
+                        logger.warning("Error processing UID %s: %s", uid, e_parse)
+                        logger.debug("UID %s traceback", uid, exc_info=True)
+                        continue # Move to next message
+                    data_items.append(item)
+
+            logger.info("Finished fetching messages. Retrieved %d items.", len(data_items))
+            return data_items
+
+        except (imaplib.IMAP4.error, OSError) as e:
+            # IMAP4.abort and socket/SSL errors leave the session unusable; drop it so the
+            # next query reconnects.
+            logger.error("IMAP error during query_data: %s", e)
+            logger.debug("IMAP query traceback", exc_info=True)
+            self.disconnect()
+            return []
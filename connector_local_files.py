@@ -0,0 +1,471 @@
+# OmniNexus - connector_local_files.py
+# LocalFilesConnector: reads plain text files (.txt, .md) from a local directory.
+# Loaded on demand by the connector registry in connectors.py.
+
+import os
+import datetime
+import logging
+import codecs
+import functools
+import fnmatch
+import re
+import mmap
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from connectors import BaseConnector, freeze_schema
+from protocol import create_iso_timestamp, generate_item_id
+
+logger = logging.getLogger("omninexus.connectors.local_files")
+
+_UTC = datetime.timezone.utc
+
+@functools.lru_cache(maxsize=4096)
+def _iso(t):
+    """
+    Formats a POSIX timestamp (e.g. st_mtime) as an ISO 8601 UTC string.
+    Memoized: files copied or extracted together often share identical timestamps.
+    """
+    return datetime.datetime.fromtimestamp(t, _UTC).isoformat()
+
+@functools.lru_cache(maxsize=64)
+def _validate_encoding(encoding):
+    """Raises LookupError if encoding is not a usable text encoding. Memoized per name."""
+    "test".encode(encoding)
+
+@functools.lru_cache(maxsize=64)
+def _get_decoder(encoding):
+    """Returns the codec's decode function (bytes -> (str, consumed)), resolved once per name."""
+    return codecs.lookup(encoding).decode
+
+def _compile_globs(patterns):
+    """
+    Compiles glob patterns into a (name_regex, path_regex) pair; either may be None.
+    Patterns containing '/' are matched against the '/'-separated path relative to the
+    connector root, all others against the bare entry name (so 'node_modules' matches
+    at any depth). Note that '*' also matches '/' in path patterns, as in fnmatch.
+    """
+    name_patterns = [fnmatch.translate(p) for p in patterns if '/' not in p]
+    path_patterns = [fnmatch.translate(p.strip('/')) for p in patterns if '/' in p]
+    return (re.compile('|'.join(name_patterns)) if name_patterns else None,
+            re.compile('|'.join(path_patterns)) if path_patterns else None)
+
+def _glob_match(matchers, name, rel_path):
+    """Returns True if the entry matches either regex from _compile_globs()."""
+    name_re, path_re = matchers
+    return bool((name_re is not None and name_re.match(name)) or
+                (path_re is not None and path_re.match(rel_path)))
+
+_WILDCARD_CHARS = frozenset('*?[')
+
+def _split_pattern(pattern):
+    """
+    Splits a '/'-separated query pattern into (literal_parts, wildcard_parts): the leading
+    components without glob characters (the anchor directory) and the rest.
+    """
+    parts = [p for p in pattern.replace(os.sep, '/').split('/') if p and p != '.']
+    for i, part in enumerate(parts):
+        if _WILDCARD_CHARS.intersection(part):
+            return parts[:i], parts[i:]
+    return parts, []
+
+def _match_components(pats, parts):
+    """
+    Matches path components against compiled pattern components, where None stands
+    for '**' (zero or more directories). Other components never match across '/'.
+    """
+    if not pats:
+        return not parts
+    head = pats[0]
+    if head is None:
+        return any(_match_components(pats[1:], parts[i:]) for i in range(len(parts) + 1))
+    return bool(parts) and head.match(parts[0]) is not None and _match_components(pats[1:], parts[1:])
+
+class _PathEntry:
+    """Minimal os.DirEntry stand-in for a single known file (pattern without wildcards)."""
+    __slots__ = ("path", "name")
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+
+    def stat(self, follow_symlinks=True):
+        return os.stat(self.path, follow_symlinks=follow_symlinks)
+
+# Files below this size are read with a single os.read() sized from stat; larger ones
+# are memory-mapped and decoded straight from the mapping, skipping the intermediate
+# bytes copy (and its allocation) entirely.
+_MMAP_THRESHOLD = 1024 * 1024
+
+def _read_text(path, size, encoding, decode):
+    """
+    Reads a whole text file, decoding once and applying the same universal-newline
+    translation as open(path, 'r'). :param size: st_size from an earlier stat.
+    :param decode: The codec decode function for encoding (see _get_decoder).
+    """
+    if size == 0:
+        return ""
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        if size >= _MMAP_THRESHOLD:
+            # Length 0 maps the whole file as it is now, so growth since the stat is included
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapped:
+                text, _ = decode(mapped)
+        else:
+            # Ask for one byte more than stat reported, so a file that grew since the stat
+            # (or a short read) is noticed without an extra syscall in the common case.
+            raw = os.read(fd, size + 1)
+            if len(raw) != size:
+                parts = [raw]
+                while True:
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    parts.append(chunk)
+                raw = b"".join(parts)
+            text, _ = decode(raw)
+    finally:
+        os.close(fd)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+class LocalFilesConnector(BaseConnector):
+    """
+    Connector for accessing plain text files (.txt, .md) in a local directory.
+    Adheres to Phase 2 Data Item Structure.
+    """
+    # File extension -> MIME type reported in metadata['type']
+    _EXT_MIME = {'.txt': 'text/plain', '.md': 'text/markdown'}
+    SUPPORTED_EXTENSIONS = frozenset(_EXT_MIME)
+    # Lowercase suffixes for the walker's str.endswith() prefilter (a single C-level check)
+    _EXT_TUPLE = tuple(_EXT_MIME)
+
+    def __init__(self, connector_id, config):
+        """Initializes the per-instance content cache (see _read_one)."""
+        super().__init__(connector_id, config)
+        # path -> ((st_ino, st_size, st_mtime_ns, st_ctime_ns), Data Item), in LRU order.
+        # Guarded by a lock because _read_one may run on worker threads.
+        self._item_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    @functools.lru_cache(maxsize=None) # Built once per class; returned read-only
+    def get_config_schema(cls):
+        return freeze_schema({
+            "path": {"type": "string", "required": True, "description": "Absolute path to the directory containing text files."},
+            "recursive": {"type": "boolean", "required": False, "default": False, "description": "Search recursively in subdirectories."},
+            "encoding": {"type": "string", "required": False, "default": "utf-8", "description": "Text encoding to use (e.g., utf-8, latin-1)."},
+            "max_workers": {"type": "integer", "required": False, "default": 1, "description": "Number of threads used to read files concurrently (1 = sequential, 0 = auto: min(32, 4 x CPU count))."},
+            "exclude": {"type": "array", "required": False, "default": [], "description": "Glob patterns for files/directories to skip (e.g., node_modules, drafts/*). Excluded directories are not descended into."},
+            "include": {"type": "array", "required": False, "default": [], "description": "Glob patterns files must match to be read (empty = all supported files)."},
+            "cache_size": {"type": "integer", "required": False, "default": 0, "description": "Number of unchanged files whose content is kept in memory between queries (0 = no cache). Files of 1 MiB or more are never cached."}
+        })
+
+    def validate_config(self):
+        """Validates the configuration for LocalFilesConnector."""
+        # Required keys, types and defaults come from the schema
+        self._apply_schema()
+
+        path = self.config["path"]
+        # Always store the absolute, normalized path so entries produced by the
+        # directory walk are already absolute and need no per-file abspath().
+        abs_path = os.path.abspath(path)
+        if not os.path.isdir(abs_path):
+            raise ValueError(f"Provided path '{path}' (resolved to '{abs_path}') is not a valid directory or is inaccessible.")
+        if abs_path != path:
+            logger.info("Relative path '%s' resolved to absolute path '%s'.", path, abs_path)
+        self._config['path'] = abs_path
+
+        encoding = self.config["encoding"]
+        try:
+             _validate_encoding(encoding) # Test if encoding is valid
+        except LookupError:
+             raise ValueError(f"Invalid encoding specified: '{encoding}'")
+
+        if self.config["max_workers"] < 0:
+             raise ValueError("Configuration key 'max_workers' must be 0 (auto) or a positive number of threads.")
+        if self.config["cache_size"] < 0:
+             raise ValueError("Configuration key 'cache_size' must be a non-negative integer.")
+
+        # Glob filters are compiled once here; the walker only runs the regexes.
+        for key in ("exclude", "include"):
+            patterns = self.config[key]
+            if not all(isinstance(p, str) and p for p in patterns):
+                raise TypeError(f"Configuration key '{key}' must be a list of non-empty glob pattern strings.")
+            self._config[key] = list(patterns)
+        self._exclude = _compile_globs(self._config['exclude'])
+        self._include = _compile_globs(self._config['include'])
+        self._has_include = bool(self._config['include'])
+        # The directory was just verified; get_metadata reports this flag instead of
+        # re-stat'ing the path on every call. refresh_status() re-checks on demand.
+        self._path_ok = True
+
+    def connect(self):
+        """No explicit connection needed for local files; re-checks that the directory is still there."""
+        if not self.refresh_status():
+            logger.error("LocalFilesConnector '%s': Path '%s' is no longer a valid directory.", self.connector_id, self.config['path'])
+            return False
+        logger.info("LocalFilesConnector '%s': Ready to access '%s'.", self.connector_id, self.config['path'])
+        return True
+
+    def clear_cache(self):
+        """Drops all cached file contents; the next query re-reads every file."""
+        with self._cache_lock:
+            self._item_cache.clear()
+
+    def refresh_status(self):
+        """Re-checks that the configured directory exists, updating the cached status. Returns the result."""
+        self._path_ok = os.path.isdir(self.config.get("path", ""))
+        return self._path_ok
+
+    def disconnect(self):
+        """No explicit disconnection needed."""
+        pass
+
+    def get_metadata(self):
+        """Returns metadata about this local files connector."""
+        return {
+            "connector_id": self.connector_id,
+            "type": "local_files",
+            "path": self.config.get("path"),
+            "recursive": self.config.get("recursive"),
+            "encoding": self.config.get("encoding"),
+            "max_workers": self.config.get("max_workers"),
+            "exclude": self.config.get("exclude"),
+            "include": self.config.get("include"),
+            "cache_size": self.config.get("cache_size"),
+            "supported_extensions": sorted(self.SUPPORTED_EXTENSIONS),
+            "status": "ready" if self._path_ok else "error - path invalid"
+        }
+
+    def _walk(self, base_path, recursive, rel_root=""):
+        """
+        Lazily yields os.DirEntry objects for supported files below base_path using
+        os.scandir, descending into subdirectories when recursive. Hidden entries
+        (leading '.') are skipped, as glob did, and symlinked directories are not followed.
+        The extension is checked on the name before is_file()/is_dir() are consulted, so
+        non-matching entries in a non-recursive scan are never classified at all.
+        Symlinks (to files or directories) are ignored.
+        Entries matching 'exclude' are dropped - directories before they are descended
+        into, pruning the whole subtree. When 'include' is set, files must also match it.
+        """
+        ext_tuple = self._EXT_TUPLE
+        exclude = self._exclude
+        include = self._include if self._has_include else None
+        # (directory, its path relative to the connector root + '/'); rel_root is set when
+        # the walk starts below the root (pattern queries), so exclude/include still apply.
+        pending = [(base_path, rel_root)]
+        while pending:
+            dir_path, rel_dir = pending.pop()
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    name = entry.name
+                    if name.startswith('.'):
+                        continue
+                    rel_path = rel_dir + name
+                    if _glob_match(exclude, name, rel_path):
+                        continue
+                    # DirEntry.is_dir()/is_file() reuse the d_type from the listing (no extra
+                    # stat on most filesystems), but are still only asked when needed.
+                    if name.lower().endswith(ext_tuple):
+                        if entry.is_file(follow_symlinks=False):
+                            if include is None or _glob_match(include, name, rel_path):
+                                yield entry
+                            continue
+                    if recursive and entry.is_dir(follow_symlinks=False):
+                        pending.append((entry.path, rel_path + "/"))
+
+    def _read_one(self, entry, encoding, decode, retrieved_at):
+        """
+        Stats and reads a single file entry and builds its Data Item.
+        Returns None (after logging a warning) if the file can't be processed.
+        """
+        filepath = entry.path # Already absolute: the walk is rooted at the absolute base path
+        name = entry.name
+        mime = self._EXT_MIME.get(name[name.rfind('.'):].lower())
+        if mime is None:
+            return None
+        try:
+            # Get file metadata (cached on the entry after the first call)
+            stat_result = entry.stat(follow_symlinks=False)
+            file_size = stat_result.st_size
+
+            # Unchanged since the last query (same inode, size, mtime and ctime)? Reuse the
+            # cached item and skip the open/read/decode; only the per-fetch fields are new.
+            # Large (memory-mapped) files are never cached, so one of them can't pin its
+            # whole content in memory between queries
+            cache_size = self.config.get("cache_size", 0) if file_size < _MMAP_THRESHOLD else 0
+            if cache_size:
+                signature = (stat_result.st_ino, file_size, stat_result.st_mtime_ns, stat_result.st_ctime_ns)
+                with self._cache_lock:
+                    cached = self._item_cache.get(filepath)
+                    if cached is not None and cached[0] == signature:
+                        self._item_cache.move_to_end(filepath)
+                        cached_item = cached[1]
+                        return {
+                            "item_id": generate_item_id(),
+                            "connector_id": cached_item["connector_id"],
+                            "source_uri": cached_item["source_uri"],
+                            "retrieved_at": retrieved_at,
+                            "metadata": dict(cached_item["metadata"]),
+                            "payload": dict(cached_item["payload"])
+                        }
+
+            created_time = _iso(stat_result.st_ctime)
+            modified_time = _iso(stat_result.st_mtime)
+
+            # Read content (single sized read + one decode for typical files)
+            content = _read_text(filepath, file_size, encoding, decode)
+        except Exception as e:
+            logger.warning("Could not process file '%s': %s", filepath, e)
+            return None
+
+        # Build the Data Item in a single constant-key literal
+        # (cheaper than dict(zip(keys, values))).
+        item = {
+            "item_id": generate_item_id(),
+            "connector_id": self.connector_id,
+            "source_uri": "file://" + filepath, # Use file URI scheme
+            "retrieved_at": retrieved_at,
+            "metadata": {
+                "type": mime,
+                "filename": name,
+                "created_time": created_time,
+                "modified_time": modified_time,
+                "size_bytes": file_size,
+                "encoding": encoding,
+                "full_path": filepath # Keep path accessible if needed
+            },
+            "payload": {
+                "content": content
+            }
+        }
+        if cache_size:
+            # Store a private copy so callers mutating the returned item can't corrupt the cache
+            cached_item = dict(item, metadata=dict(item["metadata"]), payload=dict(item["payload"]))
+            with self._cache_lock:
+                self._item_cache[filepath] = (signature, cached_item)
+                self._item_cache.move_to_end(filepath)
+                while len(self._item_cache) > cache_size:
+                    self._item_cache.popitem(last=False)
+        return item
+
+    def _pattern_entries(self, base_path, pattern):
+        """
+        Yields file entries matching a glob pattern relative to base_path, e.g.
+        'notes/**/*.md'. The directory walk starts at the longest wildcard-free prefix
+        ('notes'), so sibling subtrees are never listed. '*', '?' and '[...]' match
+        within one path component; '**' matches any number of directories. A pattern
+        without wildcards names a single file (or a directory to scan non-recursively).
+        """
+        literal, rest = _split_pattern(pattern)
+        if os.path.isabs(pattern) or '..' in literal or '..' in rest:
+            logger.error("Query pattern '%s' must be relative to the connector path.", pattern)
+            return
+        # The anchor must not lie in (or be) an excluded directory, as _walk would never
+        # have descended into it
+        for i, part in enumerate(literal):
+            if _glob_match(self._exclude, part, "/".join(literal[:i + 1])):
+                return
+        anchor = os.path.join(base_path, *literal)
+        rel_root = "/".join(literal) + "/" if literal else ""
+        if not rest:
+            # No wildcards: direct lookup, no directory listing at all
+            if os.path.isfile(anchor) and not os.path.islink(anchor):
+                rel_path = "/".join(literal)
+                if anchor.lower().endswith(self._EXT_TUPLE) and \
+                        (not self._has_include or _glob_match(self._include, literal[-1], rel_path)):
+                    yield _PathEntry(anchor)
+            elif os.path.isdir(anchor):
+                yield from self._walk(anchor, False, rel_root)
+            return
+        if not os.path.isdir(anchor):
+            return
+        pats = [None if p == '**' else re.compile(fnmatch.translate(p)) for p in rest]
+        # Descend if the pattern has directory components or '**' (which may be trailing)
+        recursive = len(rest) > 1 or None in pats
+        skip = len(anchor) + 1
+        for entry in self._walk(anchor, recursive, rel_root):
+            rel_parts = entry.path[skip:].split(os.sep)
+            if _match_components(pats, rel_parts):
+                yield entry
+
+    def query_data(self, query_params=None):
+        """
+        Retrieves content from text files, structuring output as standard Data Items.
+        Materializes iter_data(); prefer iter_data() when the items can be processed
+        one at a time.
+        :param query_params: Optional dict. Supported key: 'pattern' (see iter_data).
+        """
+        return list(self.iter_data(query_params))
+
+    def iter_data(self, query_params=None):
+        """
+        Generator variant of query_data: yields one Data Item per file as it is read,
+        so only a bounded number of files' contents are held in memory at a time (one when
+        reading sequentially, about 2 x max_workers with threads), plus whatever the
+        opt-in 'cache_size' cache keeps.
+        :param query_params: Optional dict. If it has a 'pattern' key (e.g. 'notes/**/*.md'),
+                             only files whose path relative to the connector path matches
+                             it are read, and the pattern (not the 'recursive' setting)
+                             decides how deep to scan.
+        """
+        pattern = (query_params or {}).get("pattern")
+        base_path = self.config.get("path")
+        recursive = self.config.get("recursive", False)
+        encoding = self.config.get("encoding", "utf-8") # Fallback just in case
+        max_workers = self.config.get("max_workers", 1)
+        if max_workers == 0:
+            # Auto: reads block in the kernel with the GIL released, so oversubscribing the CPUs pays off
+            max_workers = min(32, (os.cpu_count() or 1) * 4)
+
+        # The directory was verified by validate_config; it isn't re-stat'ed per query.
+        # If it has vanished since, the scan fails below and the status is updated then.
+        if not base_path:
+            logger.error("Path '%s' for connector '%s' is invalid.", base_path, self.connector_id)
+            return # Yields nothing
+
+        logger.info("Querying path=%s recursive=%s encoding=%s max_workers=%s pattern=%s", base_path, recursive, encoding, max_workers, pattern)
+
+        try:
+            retrieved_at = create_iso_timestamp() # One timestamp for the whole scan
+            decode = _get_decoder(encoding) # Resolve the codec once, not per file
+            if pattern:
+                entries = self._pattern_entries(base_path, pattern)
+            else:
+                entries = self._walk(base_path, recursive)
+            if max_workers > 1:
+                # Reads are I/O bound; threads overlap the open/read latency (useful on
+                # network mounts). Only a bounded window of reads is in flight (unlike
+                # executor.map, which would submit the whole walk up front), and results
+                # are yielded in walk order.
+                window = 2 * max_workers
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    pending = deque()
+                    for entry in entries:
+                        pending.append(executor.submit(self._read_one, entry, encoding, decode, retrieved_at))
+                        if len(pending) >= window:
+                            item = pending.popleft().result()
+                            if item is not None:
+                                yield item
+                    while pending:
+                        item = pending.popleft().result()
+                        if item is not None:
+                            yield item
+            else:
+                for entry in entries:
+                    item = self._read_one(entry, encoding, decode, retrieved_at)
+                    if item is not None:
+                        yield item
+
+        except (FileNotFoundError, NotADirectoryError) as e:
+             # Only now is the path checked again, so get_metadata reflects a removed directory
+             if not self.refresh_status():
+                 logger.error("Path '%s' for connector '%s' is invalid.", base_path, self.connector_id)
+             else:
+                 logger.error("Error querying files for connector '%s': %s", self.connector_id, e)
+        except Exception as e:
+             logger.error("Error querying files for connector '%s': %s", self.connector_id, e)
@@ -72,6 +72,7 @@ class MyNewConnector(BaseConnector):
         """
         # Always call the parent class's __init__ first!
         # This handles storing connector_id, config, and basic validation.
+        # Note: self.config is a read-only view; write defaults through self._config.
         super().__init__(connector_id, config)
 
         # TODO: Add any connector-specific initialization here.
@@ -108,7 +109,7 @@ class MyNewConnector(BaseConnector):
              raise TypeError("'config_param_2' must be an integer.")
         if param2 <= 0:
              raise ValueError("'config_param_2' must be positive.")
-        self.config['config_param_2'] = param2 # Ensure the potentially defaulted value is stored back
+        self._config['config_param_2'] = param2 # Store the potentially defaulted value back
 
         # TODO: Add validation logic for all your required/optional config parameters.
         # Check types, value ranges, formats (e.g., URL format, file existence).
@@ -278,10 +279,11 @@ class MyNewConnector(BaseConnector):
 
 # --- Registration (Important!) ---
 # To make this connector available to OmniNexus:
-# 1. Import this class in `connectors.py`.
-# 2. Add an entry to the `_connector_types` dictionary in `connectors.py`:
+# 1. Save it as its own module next to `connectors.py` (e.g. `connector_my_new.py`).
+# 2. Add an entry to the `_connector_types` dictionary in `connectors.py`, mapping the
+#    type string to (module name, class name). The module is imported lazily on first use:
 #    _connector_types = {
-#        "local_files": LocalFilesConnector,
-#        "imap": ImapConnector,
-#        "my_new_connector": MyNewConnector  # TODO: Use your chosen type string here
+#        "local_files": ("connector_local_files", "LocalFilesConnector"),
+#        "imap": ("connector_imap", "ImapConnector"),
+#        "my_new_connector": ("connector_my_new", "MyNewConnector")  # TODO: Use your chosen type string here
 #    }
\ No newline at end of file
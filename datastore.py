@@ -1,246 +1,588 @@
 # OmniNexus - datastore.py
 # Simple file-based JSON datastore for PoC metadata (connectors, agents).
 
+import atexit
 import json
+import logging
+import mmap
 import os
 import threading # To prevent race conditions during save
+import types
+from contextlib import contextmanager
+try:
+    import orjson # Optional: parses straight from bytes/memoryview, several times faster than json
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger("omninexus.datastore")
 
 # Configuration
 DATASTORE_DIR = "omnidata"
 CONNECTORS_FILE = os.path.join(DATASTORE_DIR, "connectors.json")
 AGENTS_FILE = os.path.join(DATASTORE_DIR, "agents.json")
-
-# In-memory cache of the data (simplification for PoC)
-_connectors_data = {}
-_agents_data = {}
+# If True, every save is flushed to stable storage (file data, then the directory entry
+# for the rename) before it counts as done. Off by default: saves are then only as
+# durable as the OS page cache, which is much faster and fine for PoC metadata.
+DURABLE_SAVES = False
+
+# Files at least this large are parsed (with orjson) straight from an mmap of the file;
+# below it a single os.read() is cheaper than setting up the mapping.
+_MMAP_THRESHOLD = 64 * 1024
+
+# Both parsers take the raw UTF-8 bytes, so no intermediate str is decoded first
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+if orjson is not None:
+    def _json_dumps(data):
+        """Serializes data to indented UTF-8 JSON bytes in one native pass."""
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+else:
+    def _json_dumps(data):
+        """Serializes data to indented UTF-8 JSON bytes (same layout as the orjson path)."""
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+class RWLock:
+    """
+    Reader/writer lock: any number of readers may hold it at once, a writer holds it
+    alone. Waiting writers block new readers, so a steady stream of reads can't starve
+    a writer. Not reentrant - don't take it again (in either mode) while holding it.
+    """
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writers_waiting = 0
+        self._writing = False
+
+    @contextmanager
+    def read(self):
+        """Context manager holding the lock in shared (read) mode."""
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        """Context manager holding the lock in exclusive (write) mode."""
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
 
 # Lock to prevent race conditions when writing files
 _save_lock = threading.Lock()
 
-def _ensure_datastore_dir():
-    """Ensures the datastore directory exists."""
-    os.makedirs(DATASTORE_DIR, exist_ok=True)
+# While a batch_updates() block is open, mutators only mark their store dirty
+_batch_depth = 0
+
+# Background saving: mutators only queue their store and return; a single worker
+# thread writes the current data, so changes made while a save is queued share one write.
+_save_cond = threading.Condition()
+_pending_saves = set() # JsonStore instances waiting to be written
+_save_in_progress = False
+_save_thread = None
+
+def _ensure_datastore_dir(dirpath=None):
+    """Ensures the datastore directory (or dirpath) exists. Checked on every save, so a directory removed while running is recreated."""
+    os.makedirs(dirpath or DATASTORE_DIR, exist_ok=True)
 
 def _load_json_file(filepath):
-    """Loads data from a JSON file."""
-    _ensure_datastore_dir()
-    if not os.path.exists(filepath):
+    """Loads data from a JSON file. Returns an empty dict if it's missing, empty or unreadable."""
+    try:
+        fd = os.open(filepath, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    except FileNotFoundError:
         return {} # Return empty dict if file doesn't exist
+    except OSError as e:
+        logger.error("Error loading datastore file %s: %s", filepath, e)
+        return {}
     try:
-        with open(filepath, 'r') as f:
-            # Handle empty file case
-            content = f.read()
-            if not content:
-                return {}
-            return json.loads(content)
-    except (IOError, json.JSONDecodeError) as e:
-        print(f"Error loading datastore file {filepath}: {e}")
+        size = os.fstat(fd).st_size
+        if not size:
+            return {} # Handle empty file case
+        if orjson is not None and size >= _MMAP_THRESHOLD:
+            # Parse in place from the page cache, without copying the file into a buffer
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                return orjson.loads(view)
+        # One byte more than fstat reported, so growth or a short read is noticed
+        raw = os.read(fd, size + 1)
+        if len(raw) != size:
+            parts = [raw]
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                parts.append(chunk)
+            raw = b"".join(parts)
+        return _json_loads(raw)
+    except (OSError, ValueError) as e: # ValueError covers JSON and UTF-8 decode errors
+        logger.error("Error loading datastore file %s: %s", filepath, e)
         # In case of error, maybe return empty or raise? For PoC, return empty.
         return {}
+    finally:
+        os.close(fd)
+
+def _fsync_dir(dirpath):
+    """Flushes a directory entry (e.g. a just-renamed file) to disk. No-op where unsupported."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return # e.g. Windows, where directories can't be opened for fsync
+    fd = os.open(dirpath or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
 def _save_json_file(filepath, data):
     """Saves data to a JSON file atomically (using a lock)."""
-    _ensure_datastore_dir()
+    _ensure_datastore_dir(os.path.dirname(filepath))
     with _save_lock: # Acquire lock before writing
+        # Write to a temporary file first
+        temp_filepath = filepath + ".tmp"
+        replaced = False
         try:
-            # Write to a temporary file first
-            temp_filepath = filepath + ".tmp"
-            with open(temp_filepath, 'w') as f:
-                json.dump(data, f, indent=4)
+            # Serialize to bytes first, then hand them to the unbuffered file in one
+            # write() - no copy into an io buffer. Loop only in case of a short write.
+            payload = memoryview(_json_dumps(data))
+            with open(temp_filepath, 'wb', buffering=0) as f:
+                while payload:
+                    payload = payload[f.write(payload):]
+                if DURABLE_SAVES:
+                    # fdatasync skips the inode metadata flush (mtime etc.) that fsync adds
+                    getattr(os, 'fdatasync', os.fsync)(f.fileno())
             # Rename temporary file to the actual file (atomic on most OS)
             os.replace(temp_filepath, filepath)
-            # print(f"Data saved to {filepath}") # Optional: uncomment for debugging
+            replaced = True
+            if DURABLE_SAVES:
+                _fsync_dir(os.path.dirname(filepath))
+            logger.debug("Data saved to %s", filepath)
         except IOError as e:
-            print(f"Error saving datastore file {filepath}: {e}")
+            logger.error("Error saving datastore file %s: %s", filepath, e)
         finally:
-            # Ensure temporary file is removed if rename failed
-            if os.path.exists(temp_filepath):
+            # Remove the temporary file if the rename didn't happen (no stat on success)
+            if not replaced:
                 try:
                     os.remove(temp_filepath)
+                except FileNotFoundError:
+                    pass
                 except OSError as e:
-                     print(f"Error removing temporary file {temp_filepath}: {e}")
+                     logger.error("Error removing temporary file %s: %s", temp_filepath, e)
+
+
+class JsonStore:
+    """
+    An in-memory dict (id -> config dict) backed by one JSON file. Reads are served from
+    memory under the store's RWLock; changes are saved by the background worker, or once
+    per batch_updates() block. Compound operations in this module work on self.data
+    directly while holding self.lock.
+    """
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.data = {}
+        self.lock = RWLock()
+        self.dirty = False # True while there are changes not yet written
+
+    def _on_load(self, data):
+        """Hook run under the write lock on freshly loaded data. Returns True if it changed it."""
+        return False
+
+    def _on_set(self, key, value):
+        """Hook run under the write lock after value is stored under key."""
+
+    def _on_remove(self, key):
+        """Hook run under the write lock after key is removed."""
+
+    def load(self):
+        """Replaces the in-memory data with the file's contents and returns it."""
+        loaded = _load_json_file(self.filepath)
+        with self.lock.write():
+            migrated = self._on_load(loaded)
+            self.data = loaded
+        if migrated:
+            self.changed() # Save immediately if migration occurred
+        return loaded
+
+    def save(self):
+        """Writes the current data to the file now."""
+        # A read lock is enough: it keeps mutators out while the dict is serialized
+        with self.lock.read():
+            self.dirty = False
+            _save_json_file(self.filepath, self.data)
+
+    def changed(self):
+        """Marks the data as modified; queues a background save unless inside batch_updates()."""
+        self.dirty = True
+        if not _batch_depth:
+            _schedule_save(self)
+
+    def get(self, key):
+        """Returns the value stored under key, or None."""
+        with self.lock.read():
+            return self.data.get(key)
+
+    def get_all(self, snapshot=False):
+        """Returns a read-only live view of all entries, or a shallow copy if snapshot is True."""
+        if snapshot:
+            with self.lock.read():
+                return self.data.copy()
+        return types.MappingProxyType(self.data)
+
+    def upsert(self, key, value):
+        """
+        Stores value under key and queues a save. Returns False, without saving, if an
+        equal value is already stored. The same dict object may have been edited in
+        place, so passing the stored object itself always saves.
+        """
+        with self.lock.write():
+            existing = self.data.get(key)
+            if existing is not value and existing == value:
+                return False
+            self.data[key] = value
+            self._on_set(key, value)
+        self.changed()
+        return True
+
+    def remove(self, key):
+        """Removes key and queues a save. Returns False if it wasn't present."""
+        with self.lock.write():
+            if self.data.pop(key, None) is None:
+                return False
+            self._on_remove(key)
+        self.changed()
+        return True
+
+
+def _normalize_connector_config(connector_id, config):
+    """
+    The single validation path for connector configs, used both on load and on
+    add/update. Ensures 'allowed_agent_types' is a list (a set or frozenset is turned into
+    a sorted list), defaulting to empty - no agents allowed.
+    Returns True if the field was missing or invalid and had to be reset.
+    :raises TypeError: If config is not a dictionary.
+    """
+    if not isinstance(config, dict):
+        raise TypeError(f"Config for connector '{connector_id}' must be a dictionary.")
+    agent_types = config.get('allowed_agent_types')
+    if isinstance(agent_types, list):
+        return False
+    if isinstance(agent_types, (set, frozenset)):
+        config['allowed_agent_types'] = sorted(agent_types)
+        return False
+    if agent_types is not None:
+        logger.warning("'allowed_agent_types' for %s was not a list. Resetting to empty.", connector_id)
+    config['allowed_agent_types'] = []
+    return True
+
+
+class ConnectorStore(JsonStore):
+    """
+    JsonStore for connector configs. Each config's 'allowed_agent_types' list is mirrored
+    in a private per-connector set (for O(1) membership checks) and in an inverted agent
+    type -> connector ids index; configs handed out keep the plain list. Edits made
+    directly to a config dict bypass both.
+    """
+    def __init__(self, filepath):
+        super().__init__(filepath)
+        self._agent_to_connectors = {}
+        self._indexed_agent_types = {} # connector id -> frozenset of its allowed agent types
+
+    def _index(self, connector_id, config):
+        agent_types = frozenset(config.get('allowed_agent_types', ()))
+        self._indexed_agent_types[connector_id] = agent_types
+        for agent_type in agent_types:
+            self._agent_to_connectors.setdefault(agent_type, set()).add(connector_id)
+
+    def _unindex(self, connector_id):
+        for agent_type in self._indexed_agent_types.pop(connector_id, ()):
+            connector_ids = self._agent_to_connectors[agent_type]
+            connector_ids.discard(connector_id)
+            if not connector_ids:
+                del self._agent_to_connectors[agent_type]
+
+    def _on_load(self, data):
+        # Ensure existing connectors have the permissions field (backward compatibility)
+        updated = False
+        for conn_id, config in list(data.items()):
+            try:
+                updated |= _normalize_connector_config(conn_id, config)
+            except TypeError as e:
+                logger.error("Dropping invalid connector entry: %s", e)
+                del data[conn_id]
+                updated = True
+        self._agent_to_connectors.clear()
+        self._indexed_agent_types.clear()
+        for conn_id, config in data.items():
+            self._index(conn_id, config)
+        if updated:
+             logger.info("Updated existing connector configs with default 'allowed_agent_types'.")
+        return updated
+
+    def _on_set(self, key, value):
+        self._unindex(key)
+        self._index(key, value)
+
+    def _on_remove(self, key):
+        self._unindex(key)
+
+    def allowed_agents(self, connector_id):
+        """Returns a sorted list of the agent types allowed for a connector, or None if not found."""
+        with self.lock.read():
+            if connector_id in self.data:
+                return sorted(self._indexed_agent_types.get(connector_id, ()))
+        return None
+
+    def connectors_for_agent(self, agent_type):
+        """Returns the ids of all connectors that allow agent_type (a frozenset, possibly empty)."""
+        with self.lock.read():
+            return frozenset(self._agent_to_connectors.get(agent_type, ()))
+
+    def set_agent_allowed(self, connector_id, agent_type, allowed):
+        """
+        Adds (allowed=True) or removes an agent type from a connector's allowed list.
+        Returns None if the connector doesn't exist, else whether anything changed.
+        """
+        # The check and the update happen under one write lock, so concurrent
+        # allow/disallow calls can't lose each other's updates.
+        with self.lock.write():
+            connector_config = self.data.get(connector_id)
+            if not connector_config:
+                return None
+            if (agent_type in self._indexed_agent_types.get(connector_id, ())) == allowed: # O(1) set lookup
+                return False
+            agent_types = connector_config.get('allowed_agent_types')
+            if not isinstance(agent_types, list): # Handle case where it might be corrupted
+                 agent_types = []
+            if allowed:
+                agent_types = agent_types + [agent_type]
+            else:
+                agent_types = [t for t in agent_types if t != agent_type]
+            connector_config['allowed_agent_types'] = agent_types
+            self._on_set(connector_id, connector_config)
+        self.changed()
+        return True
+
+
+connectors_store = ConnectorStore(CONNECTORS_FILE)
+agents_store = JsonStore(AGENTS_FILE)
+_stores = (connectors_store, agents_store)
+
+def _save_worker():
+    """Background thread body: writes queued stores, one save per store per wake-up."""
+    global _save_in_progress
+    while True:
+        with _save_cond:
+            while not _pending_saves:
+                _save_cond.wait()
+            stores = list(_pending_saves)
+            _pending_saves.clear()
+            _save_in_progress = True
+        try:
+            for store in stores:
+                if store.dirty:
+                    store.save()
+        except Exception as e:
+            logger.exception("Error saving datastore in background: %s", e)
+        finally:
+            with _save_cond:
+                _save_in_progress = False
+                _save_cond.notify_all()
+
+def _schedule_save(store):
+    """Queues a background save of a JsonStore and returns immediately."""
+    global _save_thread
+    with _save_cond:
+        _pending_saves.add(store)
+        if _save_thread is None:
+            _save_thread = threading.Thread(target=_save_worker, name="datastore-save", daemon=True)
+            _save_thread.start()
+        _save_cond.notify_all()
+
+def flush_datastore():
+    """
+    Blocks until every change made so far is on disk: waits for queued background
+    saves, then writes anything still unsaved (e.g. from an open batch_updates() block).
+    Registered with atexit, so a normal interpreter exit never drops pending writes.
+    """
+    with _save_cond:
+        while _pending_saves or _save_in_progress:
+            _save_cond.wait()
+    for store in _stores:
+        if store.dirty:
+            store.save()
+
+atexit.register(flush_datastore)
+
+@contextmanager
+def batch_updates():
+    """
+    Context manager that defers saving until the block exits, so a run of mutations
+    (e.g. allowing several agent types) rewrites each file at most once.
+    Blocks may be nested; only the outermost one queues the save.
+    """
+    global _batch_depth
+    _batch_depth += 1
+    try:
+        yield
+    finally:
+        _batch_depth -= 1
+        if not _batch_depth:
+            for store in _stores:
+                if store.dirty:
+                    _schedule_save(store)
 
 
 # --- Connectors Data Management ---
+# Thin module-level API over connectors_store
 
 def load_connectors():
     """Loads connector data from file into memory."""
-    global _connectors_data
-    _connectors_data = _load_json_file(CONNECTORS_FILE)
-    # Ensure existing connectors have the permissions field (backward compatibility)
-    updated = False
-    for conn_id, config in _connectors_data.items():
-         if 'allowed_agent_types' not in config:
-              config['allowed_agent_types'] = [] # Default to empty list (no agents allowed)
-              updated = True
-         # Ensure it's a list
-         elif not isinstance(config['allowed_agent_types'], list):
-              config['allowed_agent_types'] = []
-              updated = True
-    if updated:
-         print("Updated existing connector configs with default 'allowed_agent_types'.")
-         save_connectors() # Save immediately if migration occurred
-    # print(f"Connectors data loaded. {_connectors_data}") # Debug print can be noisy
-    return _connectors_data
+    return connectors_store.load()
 
 def save_connectors():
     """Saves the current in-memory connector data to file."""
-    _save_json_file(CONNECTORS_FILE, _connectors_data)
+    connectors_store.save()
 
-def get_all_connectors():
-    """Returns the dictionary of all registered connectors."""
-    return _connectors_data.copy() # Return a copy to prevent external modification
+def get_all_connectors(snapshot=False):
+    """
+    Returns all registered connectors as a read-only live view (no copy is made).
+    :param snapshot: If True, returns an independent shallow copy instead, for callers
+                     that need the contents as of now while mutating the store.
+    """
+    return connectors_store.get_all(snapshot)
 
 def get_connector(connector_id):
     """Gets details for a specific connector by ID."""
-    return _connectors_data.get(connector_id)
+    return connectors_store.get(connector_id)
 
 def add_or_update_connector(connector_id, connector_config):
     """
     Adds a new connector or updates an existing one.
-    Initializes 'allowed_agent_types' to an empty list if not present.
+    Initializes 'allowed_agent_types' to an empty list if not present; a set or
+    frozenset is stored as a sorted list.
     """
-    if not isinstance(connector_config, dict):
-         print("Error: connector_config must be a dictionary.")
-         return False
-
-    # Ensure the permissions list exists, default to empty (no agents allowed)
-    if 'allowed_agent_types' not in connector_config:
-         connector_config['allowed_agent_types'] = []
-    elif not isinstance(connector_config['allowed_agent_types'], list):
-         print(f"Warning: 'allowed_agent_types' for {connector_id} was not a list. Resetting to empty.")
-         connector_config['allowed_agent_types'] = []
+    try:
+        _normalize_connector_config(connector_id, connector_config)
+    except TypeError as e:
+        logger.error("%s", e)
+        return False
 
-    _connectors_data[connector_id] = connector_config
-    save_connectors() # Persist change immediately
-    # print(f"Connector '{connector_id}' added/updated.") # Make slightly less verbose maybe
+    # Persists the change (deferred inside batch_updates); re-registering an identical
+    # config (common at startup) is a no-op and causes no rewrite.
+    connectors_store.upsert(connector_id, connector_config)
+    logger.debug("Connector '%s' added/updated.", connector_id)
     return True
 
 def remove_connector(connector_id):
     """Removes a connector by ID."""
-    if connector_id in _connectors_data:
-        del _connectors_data[connector_id]
-        save_connectors() # Persist change immediately
-        print(f"Connector '{connector_id}' removed.")
+    if connectors_store.remove(connector_id):
+        logger.debug("Connector '%s' removed.", connector_id)
         return True
     else:
-        # print(f"Connector '{connector_id}' not found.") # CLI will handle message
+        logger.debug("Connector '%s' not found.", connector_id) # CLI will handle message
         return False
 
 
 def get_allowed_agents_for_connector(connector_id):
-    """Returns the list of allowed agent types for a connector, or None if connector not found."""
-    connector_config = get_connector(connector_id)
-    if connector_config:
-        # Ensure field exists (should be handled by load/add, but double-check)
-        return connector_config.get('allowed_agent_types', [])
-    return None
+    """Returns a sorted list of the agent types allowed for a connector, or None if connector not found."""
+    return connectors_store.allowed_agents(connector_id)
+
+def get_connectors_for_agent(agent_type):
+    """Returns the ids of all connectors that allow agent_type (a frozenset, possibly empty)."""
+    return connectors_store.connectors_for_agent(agent_type)
 
 def allow_agent_for_connector(connector_id, agent_type):
     """Adds an agent type to the allowed list for a specific connector."""
-    connector_config = get_connector(connector_id)
-    if not connector_config:
-        print(f"Error: Connector '{connector_id}' not found.")
+    changed = connectors_store.set_agent_allowed(connector_id, agent_type, True)
+    if changed is None:
+        logger.error("Connector '%s' not found.", connector_id)
         return False
-
-    allowed_list = connector_config.get('allowed_agent_types', [])
-    if not isinstance(allowed_list, list): # Ensure it's a list before appending
-         allowed_list = []
-
-    if agent_type not in allowed_list:
-        allowed_list.append(agent_type)
-        connector_config['allowed_agent_types'] = allowed_list # Update the config dict
-        _connectors_data[connector_id] = connector_config # Ensure update is reflected in main dict
-        save_connectors() # Persist the change
-        print(f"Agent type '{agent_type}' allowed for connector '{connector_id}'.")
-        return True
+    if changed:
+        logger.debug("Agent type '%s' allowed for connector '%s'.", agent_type, connector_id)
     else:
-        print(f"Agent type '{agent_type}' is already allowed for connector '{connector_id}'.")
-        return True # Indicate success even if no change needed
+        logger.debug("Agent type '%s' is already allowed for connector '%s'.", agent_type, connector_id)
+    return True # Indicate success even if no change needed
 
 def disallow_agent_for_connector(connector_id, agent_type):
     """Removes an agent type from the allowed list for a specific connector."""
-    connector_config = get_connector(connector_id)
-    if not connector_config:
-        print(f"Error: Connector '{connector_id}' not found.")
+    changed = connectors_store.set_agent_allowed(connector_id, agent_type, False)
+    if changed is None:
+        logger.error("Connector '%s' not found.", connector_id)
         return False
-
-    allowed_list = connector_config.get('allowed_agent_types', [])
-    if not isinstance(allowed_list, list): # Handle case where it might be corrupted
-         allowed_list = []
-
-    if agent_type in allowed_list:
-        allowed_list.remove(agent_type)
-        connector_config['allowed_agent_types'] = allowed_list # Update the config dict
-        _connectors_data[connector_id] = connector_config # Ensure update is reflected in main dict
-        save_connectors() # Persist the change
-        print(f"Agent type '{agent_type}' disallowed for connector '{connector_id}'.")
-        return True
+    if changed:
+        logger.debug("Agent type '%s' disallowed for connector '%s'.", agent_type, connector_id)
     else:
-        print(f"Agent type '{agent_type}' was not in the allowed list for connector '{connector_id}'.")
-        return True # Indicate success even if no change needed
+        logger.debug("Agent type '%s' was not in the allowed list for connector '%s'.", agent_type, connector_id)
+    return True # Indicate success even if no change needed
 
 
-# --- Agents Data Management --- (Structure is similar to Connectors)
+# --- Agents Data Management --- (Thin API over agents_store)
 
 def load_agents():
     """Loads agent data from file into memory."""
-    global _agents_data
-    _agents_data = _load_json_file(AGENTS_FILE)
-    print(f"Agents data loaded. {_agents_data}") # Debug print
-    return _agents_data
+    loaded = agents_store.load()
+    logger.debug("Agents data loaded. %s", loaded) # Formatted only if DEBUG is enabled
+    return loaded
 
 def save_agents():
     """Saves the current in-memory agent data to file."""
-    _save_json_file(AGENTS_FILE, _agents_data)
+    agents_store.save()
 
-def get_all_agents():
-    """Returns the dictionary of all registered agents."""
-    return _agents_data.copy()
+def get_all_agents(snapshot=False):
+    """Returns all registered agents as a read-only live view, or a shallow copy if snapshot is True."""
+    return agents_store.get_all(snapshot)
 
 def get_agent(agent_id):
     """Gets details for a specific agent by ID."""
-    return _agents_data.get(agent_id)
+    return agents_store.get(agent_id)
 
 def add_or_update_agent(agent_id, agent_config):
     """Adds a new agent or updates an existing one."""
     if not isinstance(agent_config, dict):
-         print("Error: agent_config must be a dictionary.")
+         logger.error("agent_config must be a dictionary.")
          return False
-    _agents_data[agent_id] = agent_config
-    save_agents() # Persist change immediately
-    print(f"Agent '{agent_id}' added/updated.")
+    agents_store.upsert(agent_id, agent_config) # Unchanged configs cause no save
+    logger.debug("Agent '%s' added/updated.", agent_id)
     return True
 
 def remove_agent(agent_id):
     """Removes an agent by ID."""
-    if agent_id in _agents_data:
-        del _agents_data[agent_id]
-        save_agents() # Persist change immediately
-        print(f"Agent '{agent_id}' removed.")
+    if agents_store.remove(agent_id):
+        logger.debug("Agent '%s' removed.", agent_id)
         return True
     else:
-        print(f"Agent '{agent_id}' not found.")
+        logger.debug("Agent '%s' not found.", agent_id)
         return False
 
 # --- Initialization ---
 
 def initialize_datastore():
     """Loads initial data from files when the application starts."""
-    print("Initializing datastore...")
+    logger.info("Initializing datastore...")
     _ensure_datastore_dir()
     load_connectors()
     load_agents()
-    print("Datastore initialized.")
+    logger.info("Datastore initialized.")
 
 # Example of how to use it (will be called from main.py later)
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(levelname)s: %(message)s")
     print("Running datastore module directly for testing...")
     # Clean up old test data if necessary
     if os.path.exists(CONNECTORS_FILE): os.remove(CONNECTORS_FILE)
     if os.path.exists(AGENTS_FILE): os.remove(AGENTS_FILE)
-    _connectors_data = {} # Reset memory cache
-    _agents_data = {}
     
     initialize_datastore()
 
@@ -252,12 +594,13 @@ if __name__ == "__main__":
     allowed = get_allowed_agents_for_connector("conn_perm_test")
     print(f"Initial allowed agents for conn_perm_test: {allowed}") # Should be []
 
-    # Allow agents
-    allow_agent_for_connector("conn_perm_test", "word_counter")
-    allow_agent_for_connector("conn_perm_test", "summarizer")
-    allow_agent_for_connector("conn_perm_test", "word_counter") # Try allowing again
+    # Allow agents (batched: connectors.json is written once, when the block exits)
+    with batch_updates():
+        allow_agent_for_connector("conn_perm_test", "word_counter")
+        allow_agent_for_connector("conn_perm_test", "summarizer")
+        allow_agent_for_connector("conn_perm_test", "word_counter") # Try allowing again
     allowed = get_allowed_agents_for_connector("conn_perm_test")
-    print(f"Allowed agents after additions: {allowed}") # Should be ['word_counter', 'summarizer']
+    print(f"Allowed agents after additions: {allowed}") # Should be ['summarizer', 'word_counter']
     print("Full config:", get_connector("conn_perm_test"))
 
     # Disallow agent
@@ -271,8 +614,8 @@ if __name__ == "__main__":
 
     # Test loading preserves list (or adds it)
     print("\n--- Testing Load/Save ---")
-    _connectors_data = {} # Clear memory
-    load_connectors() # Load from file
+    flush_datastore() # Wait for the background saves before re-reading the file
+    load_connectors() # Replace memory with the file's contents
     print("Loaded config:", get_connector("conn_perm_test"))
     allowed = get_allowed_agents_for_connector("conn_perm_test")
     print(f"Allowed agents after load: {allowed}") # Should be ['summarizer']
@@ -281,6 +624,7 @@ if __name__ == "__main__":
     add_or_update_connector("conn_perm_test2", {"type": "imap", "server": "imap.example.com", "username": "test"})
     allow_agent_for_connector("conn_perm_test2", "keyword_extractor")
     print("\nAll connectors:", get_all_connectors())
+    print("Connectors allowing 'summarizer':", sorted(get_connectors_for_agent("summarizer"))) # ['conn_perm_test']
 
     # Test Agent Operations
     print("\n--- Testing Agents ---")
@@ -2,22 +2,47 @@
 # Basic identity management - Generates/loads a password-protected local key pair.
 
 import os
+import sys
 import json
+import base64
 import getpass # For securely prompting for password
-import traceback
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes # Needed for PBE
+import hashlib
+import hmac
+import threading
+# cryptography (cffi + OpenSSL bindings) is imported inside the functions that need it,
+# so importing this module stays cheap until keys are actually generated or loaded.
+try:
+    import orjson # Optional: faster JSON straight from/to bytes
+except ImportError:
+    orjson = None
 
 # Configuration
 KEY_FILE = "local_identity.json"
-KEY_SIZE = 2048
-PUBLIC_EXPONENT = 65537
+# If set, used as the identity password instead of prompting (for headless runs)
+PASSWORD_ENV_VAR = "OMNINEXUS_IDENTITY_PASSWORD"
+
+if orjson is not None:
+    _json_loads = orjson.loads
+    def _json_dumps(data):
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+else:
+    _json_loads = json.loads # Also accepts UTF-8 bytes
+    def _json_dumps(data):
+        return json.dumps(data, indent=2).encode('utf-8')
 
 # Global variable to hold the loaded identity (simplification for PoC)
 _local_identity = None
 
+# Decrypted identities: absolute path -> ((st_mtime_ns, st_size), salt, password digest,
+# identity dict). Reloading a file that hasn't changed, with the same password, skips the
+# key parse and PBE decryption. The password is still required: a hit only counts when
+# its salted digest matches the one stored with the entry.
+_identity_cache = {}
+
+# Serializes identity loading/creation, so threads racing at startup share one password
+# prompt and decryption (or one key generation) instead of each doing their own.
+_identity_lock = threading.Lock()
+
 def prompt_for_password(confirm=False):
     """Securely prompts the user for a password."""
     while True:
@@ -41,19 +66,45 @@ def prompt_for_password(confirm=False):
             print(f"\nError reading password: {e}")
             return None
 
+def _password_digest(password_bytes, salt):
+    """Salted digest binding an _identity_cache entry to the password that decrypted it."""
+    return hmac.new(salt, password_bytes, hashlib.sha256).digest()
+
+def _cache_identity(filename, password_bytes, identity_obj, signature=None):
+    """Stores a decrypted identity in _identity_cache, bound to its file signature and password."""
+    if signature is None:
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return
+        signature = (st.st_mtime_ns, st.st_size)
+    salt = os.urandom(16)
+    _identity_cache[os.path.abspath(filename)] = (
+        signature, salt, _password_digest(password_bytes, salt), identity_obj)
+
+def _password_from_env():
+    """Returns the password from PASSWORD_ENV_VAR as bytes, or None if it isn't set."""
+    password = os.environ.get(PASSWORD_ENV_VAR)
+    return password.encode('utf-8') if password else None
+
 def generate_new_keys():
-    """Generates a new RSA private/public key pair."""
+    """
+    Generates a new Ed25519 private/public key pair. Unlike RSA there is no prime
+    search: the private key is just 32 random bytes, so this is effectively instant.
+    Existing RSA identity files still load (the PEM loaders detect the key type).
+    """
+    from cryptography.hazmat.primitives.asymmetric import ed25519
     print("Generating new identity keys...")
-    private_key = rsa.generate_private_key(
-        public_exponent=PUBLIC_EXPONENT,
-        key_size=KEY_SIZE,
-        backend=default_backend()
-    )
+    private_key = ed25519.Ed25519PrivateKey.generate()
     public_key = private_key.public_key()
     return private_key, public_key
 
 def serialize_keys(private_key, public_key, password_bytes):
-    """Serializes keys into PEM format strings, encrypting the private key."""
+    """
+    Serializes keys to DER bytes (PKCS8 / SubjectPublicKeyInfo), encrypting the private key.
+    DER skips PEM's base64 body and header lines, so it's smaller and parses directly.
+    """
+    from cryptography.hazmat.primitives import serialization
     if not password_bytes:
          # Fallback to no encryption if password prompt somehow failed/cancelled
          # Consider raising an error instead for stricter security
@@ -63,35 +114,38 @@ def serialize_keys(private_key, public_key, password_bytes):
          private_encryption_algorithm = serialization.BestAvailableEncryption(password_bytes)
 
     try:
-        pem_private = private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
+        der_private = private_key.private_bytes(
+            encoding=serialization.Encoding.DER,
             format=serialization.PrivateFormat.PKCS8,
             encryption_algorithm=private_encryption_algorithm
         )
-        pem_public = public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
+        der_public = public_key.public_bytes(
+            encoding=serialization.Encoding.DER,
             format=serialization.PublicFormat.SubjectPublicKeyInfo
         )
-        # Decode to strings for JSON storage
-        return pem_private.decode('utf-8'), pem_public.decode('utf-8')
+        return der_private, der_public
     except Exception as e:
         print(f"Error during key serialization: {e}")
-        traceback.print_exc()
+        if os.environ.get("OMNINEXUS_DEBUG"): # Full tracebacks only when debugging
+            import traceback
+            traceback.print_exc()
         return None, None
 
 
-def deserialize_keys(pem_private_str, pem_public_str, password_bytes):
-    """Deserializes keys from PEM format strings, decrypting private key."""
+def deserialize_keys(private_data, public_data, password_bytes, pem=False):
+    """
+    Deserializes keys from DER bytes, decrypting the private key.
+    :param pem: True for identity files written by older versions, which hold PEM text.
+    """
+    from cryptography.hazmat.primitives import serialization
+    load_private = serialization.load_pem_private_key if pem else serialization.load_der_private_key
+    load_public = serialization.load_pem_public_key if pem else serialization.load_der_public_key
     try:
-        private_key = serialization.load_pem_private_key(
-            pem_private_str.encode('utf-8'),
-            password=password_bytes, # Can be None if key wasn't encrypted
-            backend=default_backend()
-        )
-        public_key = serialization.load_pem_public_key(
-            pem_public_str.encode('utf-8'),
-            backend=default_backend()
+        private_key = load_private(
+            private_data,
+            password=password_bytes # Can be None if key wasn't encrypted
         )
+        public_key = load_public(public_data)
         return private_key, public_key
     except TypeError as e:
         # Often indicates incorrect password (or trying password on unencrypted key)
@@ -109,15 +163,11 @@ def deserialize_keys(pem_private_str, pem_public_str, password_bytes):
               print("Warning: Password provided, but private key is not encrypted.")
               # Attempt to load without password
               try:
-                   private_key = serialization.load_pem_private_key(
-                       pem_private_str.encode('utf-8'),
-                       password=None, # Try without password
-                       backend=default_backend()
-                   )
-                   public_key = serialization.load_pem_public_key(
-                       pem_public_str.encode('utf-8'),
-                       backend=default_backend()
+                   private_key = load_private(
+                       private_data,
+                       password=None # Try without password
                    )
+                   public_key = load_public(public_data)
                    return private_key, public_key
               except Exception as inner_e:
                    print(f"Failed to load unencrypted key after password mismatch: {inner_e}")
@@ -127,67 +177,143 @@ def deserialize_keys(pem_private_str, pem_public_str, password_bytes):
          return None, None
     except Exception as e:
         print(f"Unexpected error during key deserialization: {e}")
-        traceback.print_exc()
+        if os.environ.get("OMNINEXUS_DEBUG"): # Full tracebacks only when debugging
+            import traceback
+            traceback.print_exc()
         return None, None
 
 
-def save_identity_to_file(pem_private_str, pem_public_str, filename=KEY_FILE):
-    """Saves the PEM strings to a JSON file."""
+def public_key_to_pem(public_key):
+    """Returns the PEM (SubjectPublicKeyInfo) text of a public key, for display/export."""
+    from cryptography.hazmat.primitives import serialization
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode('ascii')
+
+
+def _fsync_dir(dirpath):
+    """Flushes a directory entry (e.g. a rename) to disk. No-op where directories can't be opened (Windows)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(dirpath, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def save_identity_to_file(der_private, der_public, filename=KEY_FILE):
+    """Saves the DER-encoded keys (base64 text, as JSON has no bytes type) to a JSON file. Returns True on success."""
+    _identity_cache.pop(os.path.abspath(filename), None) # The cached keys no longer match the file
     identity_data = {
-        "private_key_pem": pem_private_str,
-        "public_key_pem": pem_public_str
+        "private_key_der": base64.b64encode(der_private).decode('ascii'),
+        "public_key_der": base64.b64encode(der_public).decode('ascii')
     }
+    payload = _json_dumps(identity_data)
+    # Write a temp file and rename it over the original, so a crash mid-write can't leave
+    # a truncated identity behind. The temp file is created owner-only (0600) from the
+    # start, so no separate chmod is needed (the mode is ignored on Windows).
+    tmp_filename = filename + ".tmp"
     try:
-        with open(filename, 'w') as f:
-            json.dump(identity_data, f, indent=4)
-        print(f"Identity saved to {filename}")
-        # Set restrictive permissions (works on Linux/macOS, ignored on Windows)
         try:
-            os.chmod(filename, 0o600) # Read/write only for owner
-            print(f"Set permissions for {filename} to 600.")
-        except OSError:
-             print(f"Could not set restrictive permissions for {filename} (may not be supported on this OS).")
-        except Exception as e:
-             print(f"An unexpected error occurred setting file permissions: {e}")
+            os.remove(tmp_filename) # Stale leftover from an interrupted save
+        except FileNotFoundError:
+            pass
+        fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o600)
+        try:
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_filename, filename)
+        _fsync_dir(os.path.dirname(os.path.abspath(filename)))
+        print(f"Identity saved to {filename}")
+        return True
 
-    except IOError as e:
+    except OSError as e:
         print(f"Error saving identity file: {e}")
+        try:
+            os.remove(tmp_filename)
+        except OSError:
+            pass
+        return False
 
-def load_identity_from_file(filename=KEY_FILE):
+def load_identity_from_file(filename=KEY_FILE, password_bytes=None):
     """
     Loads the identity (keys) from a JSON file.
-    Prompts for password if the key appears encrypted.
+    Files from older versions, which store PEM text, are still read.
+    :param password_bytes: Password for the private key. If None, it is taken from
+        PASSWORD_ENV_VAR, or prompted for when running on a terminal.
     """
     global _local_identity
-    if not os.path.exists(filename):
+    cache_key = os.path.abspath(filename)
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
         return None # No identity file found
+    except OSError as e:
+        print(f"Error loading or parsing identity file {filename}: {e}")
+        return None
+    signature = (st.st_mtime_ns, st.st_size)
 
     try:
-        with open(filename, 'r') as f:
-            identity_data = json.load(f)
+        with open(filename, 'rb') as f:
+            identity_data = _json_loads(f.read())
 
-        pem_private_str = identity_data.get("private_key_pem")
-        pem_public_str = identity_data.get("public_key_pem")
+        pem = "private_key_der" not in identity_data
+        if pem:
+            private_str = identity_data.get("private_key_pem")
+            public_str = identity_data.get("public_key_pem")
+        else:
+            private_str = identity_data.get("private_key_der")
+            public_str = identity_data.get("public_key_der")
 
-        if not pem_private_str or not pem_public_str:
+        if not private_str or not public_str:
             print(f"Error: Missing key data in {filename}")
             return None
 
-        # Prompt for password - attempt decryption
+        if pem:
+            private_data, public_data = private_str.encode('utf-8'), public_str.encode('utf-8')
+        else:
+            private_data, public_data = base64.b64decode(private_str), base64.b64decode(public_str)
+
         print(f"Loading identity from {filename}...")
-        password_bytes = prompt_for_password(confirm=False)
         if password_bytes is None:
-             print("Password entry cancelled. Cannot load identity.")
-             return None # User cancelled password entry
+            password_bytes = _password_from_env()
+        if password_bytes is None:
+            if not sys.stdin.isatty():
+                print(f"Error: No terminal to prompt for the identity password. Set {PASSWORD_ENV_VAR} or pass password_bytes.")
+                return None
+            password_bytes = prompt_for_password(confirm=False)
+            if password_bytes is None:
+                 print("Password entry cancelled. Cannot load identity.")
+                 return None # User cancelled password entry
+
+        cached = _identity_cache.get(cache_key)
+        if cached is not None and cached[0] == signature and \
+                hmac.compare_digest(cached[2], _password_digest(password_bytes, cached[1])):
+            _local_identity = cached[3]
+            print(f"Identity loaded and decrypted successfully.")
+            return _local_identity
 
-        private_key, public_key = deserialize_keys(pem_private_str, pem_public_str, password_bytes)
+        private_key, public_key = deserialize_keys(private_data, public_data, password_bytes, pem=pem)
 
         if private_key and public_key:
             _local_identity = {
                 "private_key": private_key,
                 "public_key": public_key,
-                "public_key_pem": pem_public_str
+                # PEM files already hold the text; for DER it's encoded once here, not per call
+                "public_key_pem": public_str if pem else public_key_to_pem(public_key)
             }
+            _cache_identity(filename, password_bytes, _local_identity, signature)
             print(f"Identity loaded and decrypted successfully.")
             return _local_identity
         else:
@@ -200,19 +326,27 @@ def load_identity_from_file(filename=KEY_FILE):
         return None # Return None if loading fails
 
 
-def get_or_create_identity():
+def get_or_create_identity(password_bytes=None):
     """
     Loads identity from file if it exists (prompting for password),
     otherwise generates a new one (prompting for new password) and saves it.
     Returns the identity dictionary or None on failure/cancellation.
+    :param password_bytes: Password to use instead of PASSWORD_ENV_VAR or the prompt.
     """
-    global _local_identity
     if _local_identity:
         return _local_identity
+    with _identity_lock:
+        if _local_identity: # Another thread finished loading while we waited
+            return _local_identity
+        return _load_or_create_identity(password_bytes)
+
 
+def _load_or_create_identity(password_bytes):
+    """Does the actual work of get_or_create_identity. Caller must hold _identity_lock."""
+    global _local_identity
     if os.path.exists(KEY_FILE):
         # Attempt to load existing identity
-        loaded_identity = load_identity_from_file(KEY_FILE)
+        loaded_identity = load_identity_from_file(KEY_FILE, password_bytes)
         if loaded_identity:
             return loaded_identity
         else:
@@ -222,27 +356,33 @@ def get_or_create_identity():
     else:
         # Create new identity
         print(f"No existing identity found at {KEY_FILE}. Creating a new one.")
-        password_bytes = prompt_for_password(confirm=True)
         if password_bytes is None:
-            print("Password entry cancelled. Cannot create identity.")
-            return None # User cancelled password entry
+            password_bytes = _password_from_env()
+        if password_bytes is None:
+            if not sys.stdin.isatty():
+                print(f"Error: No terminal to prompt for a new identity password. Set {PASSWORD_ENV_VAR} or pass password_bytes.")
+                return None
+            password_bytes = prompt_for_password(confirm=True)
+            if password_bytes is None:
+                print("Password entry cancelled. Cannot create identity.")
+                return None # User cancelled password entry
 
         private_key, public_key = generate_new_keys()
-        pem_private_str, pem_public_str = serialize_keys(private_key, public_key, password_bytes)
-
-        if pem_private_str and pem_public_str:
-            save_identity_to_file(pem_private_str, pem_public_str, KEY_FILE)
-            # Need to reload to set global state correctly and ensure decryption works
-            print("Attempting to reload newly created identity...")
-            # We need the password again to reload immediately
-            # In a real app, might store password temporarily or handle differently
-            _local_identity = None # Clear global state before reload attempt
-            reloaded_identity = load_identity_from_file(KEY_FILE)
-            if reloaded_identity:
-                 return reloaded_identity
-            else:
-                 print("Critical Error: Failed to reload the newly created identity!")
-                 return None
+        der_private, der_public = serialize_keys(private_key, public_key, password_bytes)
+
+        if der_private and der_public:
+            if not save_identity_to_file(der_private, der_public, KEY_FILE):
+                return None
+            # The keys are already in memory, so use them directly instead of
+            # reloading the file (which would prompt for the password again)
+            _local_identity = {
+                "private_key": private_key,
+                "public_key": public_key,
+                "public_key_pem": public_key_to_pem(public_key)
+            }
+            _cache_identity(KEY_FILE, password_bytes, _local_identity)
+            print("New identity created and loaded.")
+            return _local_identity
         else:
              print("Error during key serialization. Identity not saved.")
              return None
@@ -250,22 +390,30 @@ def get_or_create_identity():
 
 def get_public_key_pem():
     """Returns the PEM formatted public key string of the current identity."""
+    # Fast path: once an identity is loaded its PEM text is kept in the identity dict,
+    # so repeated calls need no file check and no re-encoding.
+    if _local_identity:
+        return _local_identity["public_key_pem"]
     # Ensures identity is loaded/created before trying to access it
     identity_obj = get_or_create_identity()
     if identity_obj:
-        # Check if it was loaded successfully, might have failed password
-        if _local_identity:
-             return _local_identity.get("public_key_pem")
-        else:
-             # Handle case where get_or_create_identity returned None previously
-             print("Error: Identity could not be loaded or created.")
-             return None
+        return identity_obj.get("public_key_pem")
     else:
          # Handle case where get_or_create_identity failed and returned None now
          print("Error: Identity could not be loaded or created.")
          return None
 
 
+def reset_identity_cache():
+    """
+    Forgets the loaded identity and every cached decrypted key (e.g. between tests),
+    so the next access reads, and asks the password for, the identity file again.
+    """
+    global _local_identity
+    _local_identity = None
+    _identity_cache.clear()
+
+
 # Example of how to use it (will be called from main.py later)
 if __name__ == "__main__":
     # This block runs only when the script is executed directly
@@ -291,7 +439,7 @@ if __name__ == "__main__":
 
         # Test loading again (should prompt for password)
         print("\nAttempting to load the identity again (clearing memory first):")
-        _local_identity = None # Simulate app restart
+        reset_identity_cache() # Simulate app restart
         my_identity_reloaded = get_or_create_identity() # Should load existing
 
         if my_identity_reloaded:
@@ -2,51 +2,130 @@
 # PoC Entry Point & Basic CLI Orchestrator
 
 import sys
+import argparse
+import cmd
+import shlex
+import threading
+import concurrent.futures
 import os
-import traceback # For printing detailed error messages
+import logging
 
-# Import our modules
+# Import our modules. connectors and agents (which pulls in NLTK) are imported inside
+# the commands that use them, so startup and help/info-only sessions don't pay for them.
 import identity
 import datastore
-import connectors
-import agents
-import protocol # Although mostly comments, importing shows dependency
+
+logger = logging.getLogger("omninexus.main")
 
 # Global dictionary to hold active connector instances (simplification for PoC)
 # Key: connector_id, Value: connector instance
 active_connectors = {}
 
-def initialize_system():
-    """Initializes all necessary components."""
+# Shown by 'info'; resolved once since the CLI never changes its working directory
+_DATASTORE_ABS = os.path.abspath(datastore.DATASTORE_DIR)
+
+# Runs connector queries in the background (see _start_query); created on first use
+_query_executor = None
+
+# Accepted spellings for boolean config values in add_connector
+_BOOL_TRUE = frozenset(('true', 'yes', '1', 't'))
+_BOOL_FALSE = frozenset(('false', 'no', '0', 'f'))
+
+def _parse_bool(value_str):
+    lowered = value_str.lower()
+    if lowered in _BOOL_TRUE:
+        return True
+    if lowered in _BOOL_FALSE:
+        return False
+    raise ValueError("Enter true or false")
+
+def _parse_array(value_str):
+    # Comma-separated list, e.g. "node_modules, drafts/*"
+    return [part.strip() for part in value_str.split(",") if part.strip()]
+
+# Schema 'type' -> parser for the typed answer (raises ValueError on bad input).
+# Types not listed (e.g. 'string') are kept as the entered string.
+_TYPE_PARSERS = {
+    "boolean": _parse_bool,
+    "integer": int,
+    "array": _parse_array,
+}
+
+def initialize_system(auto_activate=False):
+    """
+    Initializes all necessary components.
+    :param auto_activate: Also activate every configured connector (see activate_all_cli).
+    """
     print("--- Initializing OmniNexus PoC ---")
     identity.get_or_create_identity() # Ensure identity exists
     datastore.initialize_datastore() # Load existing configs
-    # TODO: Maybe load/activate connectors from datastore automatically? For PoC, manual activation.
+    if auto_activate:
+        activate_all_cli()
     print("--- System Initialized ---")
 
 
+def _start_query(connector_instance):
+    """
+    Starts connector_instance.query_data() on a background thread and returns its Future.
+    The run_* commands create their agent (importing agents/NLTK on first use) while the
+    connector reads its data, instead of one after the other.
+    """
+    global _query_executor
+    if _query_executor is None:
+        _query_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="connector-query")
+    return _query_executor.submit(connector_instance.query_data, query_params=None)
+
+
+def _await_query(query, connector_id):
+    """
+    Waits for a query started by _start_query and reports the outcome.
+    Returns the data items, or None if there is nothing for the agent to process.
+    """
+    try:
+        data = query.result()
+    except Exception as e:
+        print(f"Error querying connector '{connector_id}': {e}")
+        logger.debug("Traceback:", exc_info=True)
+        return None
+    if data is None: # Check if query explicitly returned None (could indicate error)
+        print("Error: Query to connector returned None.")
+        return None
+    print(f"Retrieved {len(data)} data items from '{connector_id}'.")
+    if not data:
+        print("No data retrieved, nothing for the agent to process.")
+        return None
+    return data
+
+
+def _parse_int_params(arg_tokens, allowed_keys):
+    """
+    Parses 'key=N' execution parameters (already split into tokens by main()) into a dict.
+    Unknown keys and non-integer values are warned about and ignored; the agent validates again.
+    """
+    exec_params = {}
+    for token in arg_tokens:
+        key, sep, value = token.partition('=')
+        if not sep:
+            continue
+        if key in allowed_keys:
+            try:
+                exec_params[key] = int(value)
+            except ValueError:
+                print(f"Warning: Invalid integer value for execution parameter '{key}'. Ignoring.")
+        else:
+            print(f"Warning: Unknown execution parameter '{key}'. Ignoring.")
+    return exec_params
+
+
 # --- Add this new function definition ---
-def run_summarizer_cli(connector_id_and_args):
+def run_summarizer_cli(target_connector_id=None, *arg_tokens):
     """Runs the summarization agent on data from a specific active connector."""
-    if not connector_id_and_args:
+    if not target_connector_id:
         print("Usage: run_summarizer <connector_id> [summary_sentences=N]")
         print("  Optional args override agent config for this run.")
         return
 
-    # Basic parsing for optional args
-    parts = connector_id_and_args.split()
-    target_connector_id = parts[0]
-    exec_params = {}
-    for part in parts[1:]:
-        if '=' in part:
-            key, value = part.split('=', 1)
-            if key == "summary_sentences":
-                try:
-                    exec_params[key] = int(value)
-                except ValueError:
-                    print(f"Warning: Invalid integer value for execution parameter '{key}'. Ignoring.")
-            else:
-                print(f"Warning: Unknown execution parameter '{key}'. Ignoring.")
+    exec_params = _parse_int_params(arg_tokens, ("summary_sentences",))
 
     # 1. Get or automatically activate the connector instance (Using same logic as other run commands)
     connector_instance = active_connectors.get(target_connector_id)
@@ -60,23 +139,12 @@ def run_summarizer_cli(connector_id_and_args):
         else:
              print(f"Connector '{target_connector_id}' auto-activated successfully.")
 
-    # 2. Query data from the connector
+    # 2. Start querying the connector in the background
     print(f"\nQuerying data from connector '{target_connector_id}'...")
-    try:
-        data = connector_instance.query_data(query_params=None)
-        if data is None:
-             print("Error: Query to connector returned None.")
-             return
-        print(f"Retrieved {len(data)} data items from '{target_connector_id}'.")
-        if not data:
-             print("No data retrieved, nothing for the agent to process.")
-             return
-    except Exception as e:
-        print(f"Error querying connector '{target_connector_id}': {e}")
-        traceback.print_exc()
-        return
+    query = _start_query(connector_instance)
 
-    # 3. Create the SummarizationAgent instance
+    # 3. Create the SummarizationAgent instance while the query runs
+    import agents # First use also loads NLTK, overlapping the connector's reads
     agent_id = "poc_summarizer"
     agent_config = {"type": "summarizer"} # Uses default internal config
     agent_instance = agents.create_agent_instance(agent_id, agent_config)
@@ -85,71 +153,93 @@ def run_summarizer_cli(connector_id_and_args):
         print("Error: Failed to create SummarizationAgent instance.")
         return
 
+    data = _await_query(query, target_connector_id)
+    if data is None:
+        return
+
     # 4. Execute the agent
     print(f"\nExecuting agent '{agent_id}' with parameters: {exec_params if exec_params else 'Agent Defaults'}...")
     try:
         result = agent_instance.execute(data_inputs=data, parameters=exec_params if exec_params else None)
-        print("\n--- Agent Execution Result ---")
+        lines = ["\n--- Agent Execution Result ---"]
         if isinstance(result, dict):
-             print("Summary:")
-             print(result.get('summary', '(No summary generated)'))
-             print(f"\nItems Processed: {result.get('items_processed', '?')}")
-             print(f"Items Skipped: {result.get('items_skipped', '?')}")
-             if 'error' in result: print(f"Error: {result['error']}")
+             lines.append("Summary:")
+             lines.append(str(result.get('summary', '(No summary generated)')))
+             lines.append(f"\nItems Processed: {result.get('items_processed', '?')}")
+             lines.append(f"Items Skipped: {result.get('items_skipped', '?')}")
+             if 'error' in result: lines.append(f"Error: {result['error']}")
         else:
-             print(result)
-        print("-" * 20)
+             lines.append(str(result))
+        lines.append("-" * 20)
+        print("\n".join(lines))
     except Exception as e:
         print(f"Error executing agent '{agent_id}': {e}")
-        traceback.print_exc()
+        logger.debug("Traceback:", exc_info=True)
         print("-" * 20)
 
 
+# Built once; display_help() writes it with a single print call
+_HELP_TEXT = "\n".join([
+    "\nOmniNexus PoC CLI Commands:",
+    "  help                - Show this help message",
+    "  info                - Show system info (e.g., Public Key)",
+    "  types               - List available connector and agent types",
+    "  add_connector       - Add and configure a new connector instance",
+    "  list_connectors     - List configured connector instances",
+    "  activate_connector <id> - Load connector instance into memory (required before run)",
+    "  activate_all        - Activate all configured connectors (connecting them in parallel)",
+    "  deactivate_connector <id> - Remove connector instance from memory",
+    "  remove_connector <id> - Remove connector configuration permanently",
+    "  run_word_count <connector_id> - Run WordCountAgent on data from the specified *active* connector",
+    "  run_word_count_all  - Run WordCountAgent on all active connectors in parallel and sum the counts",
+    "  run_keyword_extractor <connector_id> [num_keywords=N] [min_word_length=M] - Run KeywordExtractAgent",
+    "  run_summarizer <connector_id> [summary_sentences=N] - Run SummarizationAgent",
+    "  quit / exit         - Exit the application",
+    "-" * 20,
+])
+
 # --- Modify display_help() ---
 def display_help():
     """Displays available commands."""
-    print("\nOmniNexus PoC CLI Commands:")
-    print("  help                - Show this help message")
-    print("  info                - Show system info (e.g., Public Key)")
-    print("  types               - List available connector and agent types")
-    print("  add_connector       - Add and configure a new connector instance")
-    print("  list_connectors     - List configured connector instances")
-    print("  activate_connector <id> - Load connector instance into memory (required before run)")
-    print("  deactivate_connector <id> - Remove connector instance from memory")
-    print("  remove_connector <id> - Remove connector configuration permanently")
-    print("  run_word_count <connector_id> - Run WordCountAgent on data from the specified *active* connector")
-    print("  run_keyword_extractor <connector_id> [num_keywords=N] [min_word_length=M] - Run KeywordExtractAgent")
-    print("  run_summarizer <connector_id> [summary_sentences=N] - Run SummarizationAgent")
-    print("  quit / exit         - Exit the application")
-    print("-" * 20)
+    print(_HELP_TEXT)
 
 def display_info():
     """Displays system information."""
-    print("\n--- System Info ---")
-    pub_key = identity.get_public_key_pem()
+    pub_key = identity.get_public_key_pem() # May print its own errors, so fetch before writing
+    lines = ["\n--- System Info ---"]
     if pub_key:
-        print("Local Identity Public Key (PEM):")
-        print(pub_key)
+        lines.append("Local Identity Public Key (PEM):")
+        lines.append(pub_key)
     else:
-        print("Could not load identity.")
-    print(f"Datastore Directory: {os.path.abspath(datastore.DATASTORE_DIR)}")
-    print(f"Active Connector Instances in Memory: {list(active_connectors.keys())}")
-    print("-" * 20)
+        lines.append("Could not load identity.")
+    lines.append(f"Datastore Directory: {_DATASTORE_ABS}")
+    lines.append(f"Active Connector Instances in Memory: {list(active_connectors.keys())}")
+    lines.append("-" * 20)
+    print("\n".join(lines))
 
 
 def list_available_types():
     """Lists available component types."""
-    print("\n--- Available Component Types ---")
-    print("Connector Types:", connectors.get_available_connector_types())
-    print("Agent Types:", agents.get_available_agent_types())
-    print("-" * 20)
+    import connectors
+    import agents
+    print("\n".join([
+        "\n--- Available Component Types ---",
+        f"Connector Types: {connectors.get_available_connector_types()}",
+        f"Agent Types: {agents.get_available_agent_types()}",
+        "-" * 20,
+    ]))
 
 def add_connector_cli():
     """Handles the CLI interaction for adding a connector."""
+    import connectors
     print("\n--- Add New Connector ---")
     connector_type = input("Enter connector type (e.g., 'local_files'): ").strip()
 
-    ConnectorClass = connectors.get_connector_class(connector_type)
+    try:
+        ConnectorClass = connectors.get_connector_class(connector_type)
+    except ImportError as e:
+        print(f"Error: Connector type '{connector_type}' is unavailable (missing dependency?): {e}")
+        return
     if not ConnectorClass:
         print(f"Error: Unknown connector type '{connector_type}'. Available: {connectors.get_available_connector_types()}")
         return
@@ -165,32 +255,17 @@ def add_connector_cli():
             continue # Skip to the next parameter in the schema
         # --- End of added check ---
         required = details.get("required", False)
-        prompt = f"Enter value for '{key}' ({details.get('type', 'any')})"
-        if required:
-            prompt += " (required)"
-        else:
-            prompt += f" (optional, default: {details.get('default', 'None')})"
-        prompt += f":\n  ({details.get('description', 'No description')})\n> "
+        value_type = details.get('type', 'any')
+        description = details.get('description', 'No description')
+        requirement = " (required)" if required else f" (optional, default: {details.get('default', 'None')})"
+        prompt = f"Enter value for '{key}' ({value_type}){requirement}:\n  ({description})\n> "
+        parse_value = _TYPE_PARSERS.get(details.get("type"), str) # Resolved once per field, not per attempt
 
         while True:
             value_str = input(prompt).strip()
             if value_str:
-                # Basic type conversion attempt (extend later if needed)
                 try:
-                    type_hint = details.get("type")
-                    if type_hint == "boolean":
-                        if value_str.lower() in ['true', 'yes', '1', 't']:
-                            value = True
-                        elif value_str.lower() in ['false', 'no', '0', 'f']:
-                             value = False
-                        else:
-                             raise ValueError("Enter true or false")
-                    elif type_hint == "integer":
-                         value = int(value_str)
-                    # Add other types like float if needed
-                    else: # Assume string otherwise
-                        value = value_str
-                    config[key] = value
+                    config[key] = parse_value(value_str)
                     break # Value accepted
                 except ValueError as e:
                      print(f"Invalid input: {e}. Please try again.")
@@ -199,7 +274,8 @@ def add_connector_cli():
             else:
                 # Optional field left blank, use default if available
                 if 'default' in details:
-                    config[key] = details['default']
+                    default = details['default']
+                    config[key] = list(default) if isinstance(default, list) else default # Don't share the schema's list
                     print(f"Using default value: {config[key]}")
                 break # Optional field left blank is okay
     
@@ -254,22 +330,24 @@ def add_connector_cli():
 
 def list_connectors_cli():
     """Lists configured connector instances from the datastore."""
-    print("\n--- Configured Connector Instances ---")
+    lines = ["\n--- Configured Connector Instances ---"] # Written with a single print at the end
     all_connectors = datastore.get_all_connectors()
     if not all_connectors:
-        print("No connectors configured yet. Use 'add_connector'.")
+        lines.append("No connectors configured yet. Use 'add_connector'.")
     else:
         for conn_id, config in all_connectors.items():
             active_status = "(Active)" if conn_id in active_connectors else "(Inactive)"
-            print(f"ID: {conn_id} {active_status}")
-            print(f"  Type: {config.get('type', 'N/A')}")
-            print(f"  Config: {config}") # Display full config for PoC
-            print("-" * 10)
-    print("-" * 20)
+            lines.append(f"ID: {conn_id} {active_status}")
+            lines.append(f"  Type: {config.get('type', 'N/A')}")
+            lines.append(f"  Config: {config}") # Display full config for PoC
+            lines.append("-" * 10)
+    lines.append("-" * 20)
+    print("\n".join(lines))
 
 
 def activate_connector_cli(connector_id):
     """Loads a configured connector into the active dictionary."""
+    import connectors
     if not connector_id:
         print("Usage: activate_connector <connector_id>")
         return
@@ -299,24 +377,105 @@ def activate_connector_cli(connector_id):
     print("-" * 20)
 
 
+def _destination_key(config):
+    """
+    Groups connectors by the backend their connect() hits: the IMAP host for network
+    connectors, the device holding the directory for local ones.
+    """
+    server = config.get("server")
+    if server:
+        return ("host", str(server).lower())
+    path = config.get("path")
+    if path:
+        try:
+            return ("device", os.stat(path).st_dev)
+        except OSError:
+            return ("path", path) # Missing path: connect() fails fast anyway
+    return ("type", config.get("type"))
+
+
+def _activate_concurrency():
+    """Max concurrent connect() calls per backend, from OMNINEXUS_ACTIVATE_CONCURRENCY (default 4)."""
+    try:
+        return max(1, int(os.environ.get("OMNINEXUS_ACTIVATE_CONCURRENCY", 4)))
+    except ValueError:
+        return 4
+
+
+def activate_all_cli():
+    """
+    Activates every configured connector that isn't active yet. connect() calls are
+    I/O-bound (directory checks, IMAP logins), so they run concurrently on a thread pool,
+    limited per backend (see _destination_key).
+    """
+    import connectors
+    pending = {}
+    destinations = {} # conn_id -> key of the backend it connects to
+    for conn_id, config in datastore.get_all_connectors().items():
+        if conn_id in active_connectors:
+            continue
+        instance = connectors.create_connector_instance(conn_id, config)
+        if instance:
+            pending[conn_id] = instance
+            destinations[conn_id] = _destination_key(config)
+        else:
+            print(f"Error: Failed to create instance for connector '{conn_id}'. Check configuration and logs.")
+
+    if not pending:
+        print("No inactive connectors to activate.")
+    else:
+        print(f"Activating {len(pending)} connector(s)...")
+        # Connectors sharing a backend (same disk or IMAP host) connect at most
+        # _activate_concurrency() at a time, so they don't contend with each other
+        limit = _activate_concurrency()
+        semaphores = {key: threading.Semaphore(limit) for key in set(destinations.values())}
+        def connect(conn_id):
+            with semaphores[destinations[conn_id]]:
+                return pending[conn_id].connect()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(32, len(pending))) as pool:
+            futures = {pool.submit(connect, conn_id): conn_id for conn_id in pending}
+            for future in concurrent.futures.as_completed(futures):
+                conn_id = futures[future]
+                try:
+                    connected = future.result()
+                except Exception as e:
+                    print(f"Error: Connector '{conn_id}' failed to connect: {e}")
+                    logger.debug("Traceback:", exc_info=True)
+                    continue
+                if connected:
+                    active_connectors[conn_id] = pending[conn_id]
+                    print(f"Connector '{conn_id}' activated successfully.")
+                else:
+                    print(f"Error: Connector '{conn_id}' failed to connect. Not activated.")
+
+    print("-" * 20)
+
+
 def deactivate_connector_cli(connector_id):
     """Removes a connector from the active dictionary."""
     if not connector_id:
         print("Usage: deactivate_connector <connector_id>")
         return
 
-    if connector_id in active_connectors:
-        instance = active_connectors.pop(connector_id) # Remove and get instance
-        try:
-            instance.disconnect() # Attempt cleanup
-        except Exception as e:
-            print(f"Error during disconnect for '{connector_id}': {e}")
-        print(f"Connector '{connector_id}' deactivated.")
+    instance = active_connectors.pop(connector_id, None) # Remove and get instance in one lookup
+    if instance is not None:
+        print("\n".join(_disconnect(connector_id, instance)))
     else:
         print(f"Connector '{connector_id}' is not currently active.")
     print("-" * 20)
 
 
+def _disconnect(connector_id, instance):
+    """Disconnects a connector already removed from active_connectors; returns the lines to report."""
+    lines = []
+    try:
+        instance.disconnect() # Attempt cleanup
+    except Exception as e:
+        lines.append(f"Error during disconnect for '{connector_id}': {e}")
+    lines.append(f"Connector '{connector_id}' deactivated.")
+    return lines
+
+
 def remove_connector_cli(connector_id):
     """Removes a connector configuration permanently from the datastore."""
     if not connector_id:
@@ -343,11 +502,7 @@ def run_word_count_cli(connector_id):
         print("Usage: run_word_count <connector_id>")
         return
 
-        # 1. Get or automatically activate the connector instance
-    if not connector_id: # Handle case where no ID was provided to the command
-        print("Usage: run_word_count <connector_id>")
-        return
-
+    # 1. Get or automatically activate the connector instance
     connector_instance = active_connectors.get(connector_id)
     if not connector_instance:
         print(f"Connector '{connector_id}' is not active. Attempting auto-activation...")
@@ -362,25 +517,8 @@ def run_word_count_cli(connector_id):
         else:
             print(f"Connector '{connector_id}' auto-activated successfully.")
 
-    # 2. Query data from the connector
-    print(f"\nQuerying data from connector '{connector_id}'...")
-    try:
-        # For PoC, no specific query params needed for LocalFilesConnector
-        # or WordCountAgent. Pass None.
-        data = connector_instance.query_data(query_params=None)
-        if data is None: # Check if query explicitly returned None (could indicate error)
-             print("Error: Query to connector returned None.")
-             return
-        print(f"Retrieved {len(data)} data items from '{connector_id}'.")
-        if not data:
-             print("No data retrieved, nothing for the agent to process.")
-             return
-    except Exception as e:
-        print(f"Error querying connector '{connector_id}': {e}")
-        traceback.print_exc() # Print full traceback for debugging
-        return
-
-    # 3. Create the WordCountAgent instance
+    # 2. Create the WordCountAgent instance
+    import agents
     # For PoC, agent config is hardcoded/simple. A real system would load/configure agents too.
     agent_id = "poc_word_counter"
     agent_config = {"type": "word_counter"}
@@ -390,42 +528,81 @@ def run_word_count_cli(connector_id):
         print("Error: Failed to create WordCountAgent instance.")
         return
 
-    # 4. Execute the agent with the retrieved data
-    print(f"\nExecuting agent '{agent_id}'...")
+    # 3. Stream the connector's items straight into the agent. Word counting is a running
+    # sum, so only the item being counted is held in memory, not every file's content.
+    retrieved = 0
+    def counted(items):
+        nonlocal retrieved
+        for item in items:
+            retrieved += 1
+            yield item
+
+    print(f"\nStreaming data from connector '{connector_id}' into agent '{agent_id}'...")
     try:
-        result = agent_instance.execute(data_inputs=data, parameters=None)
-        print("\n--- Agent Execution Result ---")
-        print(result)
-        print("-" * 20)
+        result = agent_instance.execute(data_inputs=counted(connector_instance.iter_data(query_params=None)), parameters=None)
     except Exception as e:
-        print(f"Error executing agent '{agent_id}': {e}")
-        traceback.print_exc() # Print full traceback for debugging
+        print(f"Error executing agent '{agent_id}' on data from '{connector_id}': {e}")
+        logger.debug("Traceback:", exc_info=True)
         print("-" * 20)
+        return
+
+    # 4. Report the result
+    print(f"Retrieved {retrieved} data items from '{connector_id}'.")
+    if not retrieved:
+        print("No data retrieved, nothing for the agent to process.")
+        return
+    print("\n--- Agent Execution Result ---")
+    print(result)
+    print("-" * 20)
+
+
+def run_word_count_all_cli():
+    """
+    Runs the word count agent over every active connector at once. Each connector's items
+    are streamed into its own agent on a worker thread, so the connectors' file/network
+    reads overlap; the per-connector counts are then summed.
+    """
+    if not active_connectors:
+        print("No active connectors. Use 'activate_connector' or 'activate_all' first.")
+        return
+    import agents
+
+    def count_words(conn_id, instance):
+        agent_instance = agents.create_agent_instance(f"poc_word_counter_{conn_id}", {"type": "word_counter"})
+        if not agent_instance:
+            raise RuntimeError("Failed to create WordCountAgent instance.")
+        return agent_instance.execute(data_inputs=instance.iter_data(query_params=None), parameters=None)
+
+    to_run = list(active_connectors.items())
+    print(f"\nCounting words across {len(to_run)} active connector(s)...")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(16, len(to_run))) as pool:
+        futures = [(conn_id, pool.submit(count_words, conn_id, instance)) for conn_id, instance in to_run]
+        totals = {"total_words": 0, "items_processed": 0, "items_skipped": 0}
+        lines = ["\n--- Agent Execution Result ---"]
+        for conn_id, future in futures: # In activation order, for stable output
+            try:
+                result = future.result()
+            except Exception as e:
+                lines.append(f"  {conn_id}: Error: {e}")
+                logger.debug("Traceback:", exc_info=True)
+                continue
+            lines.append(f"  {conn_id}: {result}")
+            for key in totals:
+                totals[key] += result.get(key, 0)
+    lines.append(f"Total: {totals}")
+    lines.append("-" * 20)
+    print("\n".join(lines))
 
 
 # --- Add this new function definition ---
-def run_keyword_extractor_cli(connector_id):
+def run_keyword_extractor_cli(target_connector_id=None, *arg_tokens):
     """Runs the keyword extraction agent on data from a specific active connector."""
-    if not connector_id:
+    if not target_connector_id:
         print("Usage: run_keyword_extractor <connector_id> [num_keywords=N] [min_word_length=M]")
         print("  Optional args override agent config for this run.")
         return
 
-    # Basic parsing for optional args (could be more robust)
-    parts = connector_id.split()
-    target_connector_id = parts[0]
-    exec_params = {}
-    for part in parts[1:]:
-        if '=' in part:
-            key, value = part.split('=', 1)
-            if key in ["num_keywords", "min_word_length"]:
-                try:
-                     # Attempt conversion here for early feedback, agent will validate again
-                    exec_params[key] = int(value)
-                except ValueError:
-                    print(f"Warning: Invalid integer value for execution parameter '{key}'. Ignoring.")
-            else:
-                print(f"Warning: Unknown execution parameter '{key}'. Ignoring.")
+    exec_params = _parse_int_params(arg_tokens, ("num_keywords", "min_word_length"))
 
     # 1. Get or automatically activate the connector instance
     connector_instance = active_connectors.get(target_connector_id)
@@ -439,23 +616,12 @@ def run_keyword_extractor_cli(connector_id):
         else:
             print(f"Connector '{target_connector_id}' auto-activated successfully.")
 
-    # 2. Query data from the connector
+    # 2. Start querying the connector in the background
     print(f"\nQuerying data from connector '{target_connector_id}'...")
-    try:
-        data = connector_instance.query_data(query_params=None)
-        if data is None:
-             print("Error: Query to connector returned None.")
-             return
-        print(f"Retrieved {len(data)} data items from '{target_connector_id}'.")
-        if not data:
-             print("No data retrieved, nothing for the agent to process.")
-             return
-    except Exception as e:
-        print(f"Error querying connector '{target_connector_id}': {e}")
-        traceback.print_exc()
-        return
+    query = _start_query(connector_instance)
 
-    # 3. Create the KeywordExtractAgent instance
+    # 3. Create the KeywordExtractAgent instance while the query runs
+    import agents
     # For PoC, agent config is default. Real system might load config from datastore.
     agent_id = "poc_keyword_extractor"
     # Base config defines default behavior (e.g., num_keywords=10)
@@ -466,80 +632,165 @@ def run_keyword_extractor_cli(connector_id):
         print("Error: Failed to create KeywordExtractAgent instance.")
         return
 
+    data = _await_query(query, target_connector_id)
+    if data is None:
+        return
+
     # 4. Execute the agent with retrieved data and optional execution parameters
     print(f"\nExecuting agent '{agent_id}' with parameters: {exec_params if exec_params else 'Agent Defaults'}...")
     try:
         result = agent_instance.execute(data_inputs=data, parameters=exec_params if exec_params else None)
-        print("\n--- Agent Execution Result ---")
+        lines = ["\n--- Agent Execution Result ---"] # Written with a single print, however many keywords
         # Pretty print the keywords list for readability
         if isinstance(result, dict) and 'keywords' in result:
-             print("Keywords:")
+             lines.append("Keywords:")
              if result['keywords']:
-                  for kw in result['keywords']:
-                       print(f"  - {kw.get('word', '?')}: {kw.get('score', '?')}")
+                  lines.extend(f"  - {kw.get('word', '?')}: {kw.get('score', '?')}" for kw in result['keywords'])
              else:
-                  print("  (No keywords found meeting criteria)")
-             print(f"Items Processed: {result.get('items_processed', '?')}")
-             print(f"Items Skipped: {result.get('items_skipped', '?')}")
-             if 'error' in result: print(f"Error: {result['error']}")
+                  lines.append("  (No keywords found meeting criteria)")
+             lines.append(f"Items Processed: {result.get('items_processed', '?')}")
+             lines.append(f"Items Skipped: {result.get('items_skipped', '?')}")
+             if 'error' in result: lines.append(f"Error: {result['error']}")
         else:
-             print(result) # Print raw result if format is unexpected
-        print("-" * 20)
+             lines.append(str(result)) # Print raw result if format is unexpected
+        lines.append("-" * 20)
+        print("\n".join(lines))
     except Exception as e:
         print(f"Error executing agent '{agent_id}': {e}")
-        traceback.print_exc()
+        logger.debug("Traceback:", exc_info=True)
         print("-" * 20)
 
 
-# --- Modify the main() function's while loop ---
-def main():
-    initialize_system()
-    display_help()
+def deactivate_all_connectors():
+    """
+    Disconnects every active connector (on quit/exit or end of input). disconnect() may
+    block on the network (IMAP logout), so connectors are disconnected concurrently and
+    their messages printed once all have finished.
+    """
+    if not active_connectors:
+        return
+    to_disconnect = list(active_connectors.items())
+    active_connectors.clear()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(32, len(to_disconnect))) as pool:
+        reports = list(pool.map(lambda pair: _disconnect(*pair), to_disconnect))
+    print("\n".join(line for lines in reports for line in lines))
+    print("-" * 20)
 
-    while True:
-        try:
-            command_line = input("OmniNexus> ").strip()
-            if not command_line:
-                continue
 
-            parts = command_line.split(maxsplit=1)
-            command = parts[0].lower()
-            args = parts[1] if len(parts) > 1 else None
-
-            if command in ["quit", "exit"]:
-                # ... (exit logic remains the same) ...
-                break # Make sure break is inside the if
-            elif command == "help":
-                display_help()
-            elif command == "info":
-                display_info()
-            elif command == "types":
-                list_available_types()
-            elif command == "add_connector":
-                add_connector_cli()
-            elif command == "list_connectors":
-                list_connectors_cli()
-            elif command == "activate_connector":
-                activate_connector_cli(args)
-            elif command == "deactivate_connector":
-                deactivate_connector_cli(args)
-            elif command == "remove_connector":
-                 remove_connector_cli(args)
-            elif command == "run_word_count":
-                run_word_count_cli(args)
-            elif command == "run_keyword_extractor":
-                run_keyword_extractor_cli(args)
-            elif command == "run_summarizer":
-                run_summarizer_cli(args)
-            # Add more commands here later
-            else:
-                print(f"Unknown command: '{command}'. Type 'help' for options.")
+class OmniNexusShell(cmd.Cmd):
+    """
+    The interactive command loop. Each command is a do_<name> method that hands its
+    arguments to the matching *_cli function. On a terminal lines are read with input()
+    (with readline completion); when stdin is piped (scripts, CI) they are read straight
+    from sys.stdin with no prompt output. Handlers such as add_connector keep reading
+    their answers from the same stream.
+    """
+    prompt = "OmniNexus> "
+
+    def __init__(self):
+        super().__init__()
+        self.use_rawinput = sys.stdin.isatty()
+        if not self.use_rawinput:
+            self.prompt = ""
+
+    @staticmethod
+    def _args(arg):
+        """Splits a command's argument string into tokens (quotes group words)."""
+        return shlex.split(arg)
+
+    def _connector_id(self, arg):
+        tokens = self._args(arg)
+        return tokens[0] if tokens else None
+
+    def precmd(self, line):
+        # Commands are case-insensitive; arguments (connector IDs) are not
+        if line == "EOF": # cmd.Cmd's end-of-input marker, handled by do_EOF
+            return line
+        command, sep, rest = line.strip().partition(" ")
+        return command.lower() + sep + rest
+
+    def onecmd(self, line):
+        try:
+            return super().onecmd(line)
         except Exception as e:
             print(f"\nAn unexpected error occurred: {e}")
             print("Please check the command and try again.")
-            traceback.print_exc()
-            pass
+            logger.debug("Traceback:", exc_info=True)
+            return False
+
+    def emptyline(self):
+        pass # cmd.Cmd would repeat the last command
+
+    def default(self, line):
+        print(f"Unknown command: '{line.split()[0]}'. Type 'help' for options.")
+
+    def do_help(self, arg):
+        display_help()
+
+    def do_info(self, arg):
+        display_info()
+
+    def do_types(self, arg):
+        list_available_types()
+
+    def do_add_connector(self, arg):
+        add_connector_cli()
+
+    def do_list_connectors(self, arg):
+        list_connectors_cli()
+
+    def do_activate_connector(self, arg):
+        activate_connector_cli(self._connector_id(arg))
+
+    def do_activate_all(self, arg):
+        activate_all_cli()
+
+    def do_deactivate_connector(self, arg):
+        deactivate_connector_cli(self._connector_id(arg))
+
+    def do_remove_connector(self, arg):
+        remove_connector_cli(self._connector_id(arg))
+
+    def do_run_word_count(self, arg):
+        run_word_count_cli(self._connector_id(arg))
+
+    def do_run_word_count_all(self, arg):
+        run_word_count_all_cli()
+
+    def do_run_keyword_extractor(self, arg):
+        run_keyword_extractor_cli(*self._args(arg))
+
+    def do_run_summarizer(self, arg):
+        run_summarizer_cli(*self._args(arg))
+
+    def do_quit(self, arg):
+        deactivate_all_connectors()
+        return True
+
+    do_exit = do_quit
+
+    def do_EOF(self, arg):
+        if self.use_rawinput:
+            print()
+        return self.do_quit(arg)
+
+
+# --- Modify the main() function's while loop ---
+def main():
+    # Connectors report progress through the 'omninexus' loggers; show INFO and above on the
+    # console, or another level from OMNINEXUS_LOG (DEBUG also shows error tracebacks)
+    log_level = logging.getLevelName(os.environ.get("OMNINEXUS_LOG", "INFO").upper())
+    if not isinstance(log_level, int): # Unknown level name
+        log_level = logging.INFO
+    logging.basicConfig(level=log_level, format="%(message)s")
+    arg_parser = argparse.ArgumentParser(description="OmniNexus PoC command-line interface.")
+    arg_parser.add_argument("--auto-activate", action="store_true",
+                            help="activate all configured connectors at startup")
+    options = arg_parser.parse_args()
+    initialize_system(auto_activate=options.auto_activate)
+    display_help()
+    OmniNexusShell().cmdloop()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
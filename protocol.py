@@ -2,6 +2,10 @@
 # Defines constants, standard formats, and conventions for OmniNexus PoC.
 # For the PoC, this is primarily documentation. A real protocol would be more formal.
 
+import enum
+import uuid
+import datetime
+
 # --- Data Structures ---
 
 # Structure expected for data returned by Connector query_data methods:
@@ -28,6 +32,8 @@ CONNECTOR_QUERY_OUTPUT_FORMAT = "List[Dict]"
 #   {'content': 'Text one', 'source': 'connector_id_or_filepath'},
 #   {'content': 'Text two', 'source': '...'},
 # ]
+# Agents that fold over their items one at a time (WordCountAgent) also accept any
+# iterable, such as a connector's iter_data() stream, so the items are never all in memory.
 AGENT_EXECUTE_INPUT_FORMAT = "List[Dict]"
 
 
@@ -67,13 +73,39 @@ COMPONENT_TYPE_KEY = "type"
 
 # --- Status / Error Codes (Conceptual for PoC) ---
 # In a larger system, we might define standard error codes/messages.
-STATUS_OK = "OK"
-STATUS_ERROR = "ERROR"
-ERROR_INVALID_CONFIG = "INVALID_CONFIG"
-ERROR_CONNECTION_FAILED = "CONNECTION_FAILED"
-ERROR_QUERY_FAILED = "QUERY_FAILED"
-ERROR_EXECUTION_FAILED = "EXECUTION_FAILED"
-ERROR_NOT_FOUND = "NOT_FOUND"
+# IntEnums compare as plain ints (cheap in per-item loops) and keep a readable .name/repr.
+class Status(enum.IntEnum):
+    OK = 0
+    ERROR = 1
+
+class ErrorCode(enum.IntEnum):
+    INVALID_CONFIG = 1
+    CONNECTION_FAILED = 2
+    QUERY_FAILED = 3
+    EXECUTION_FAILED = 4
+    NOT_FOUND = 5
+
+# Module-level aliases for the original constant names
+STATUS_OK = Status.OK
+STATUS_ERROR = Status.ERROR
+ERROR_INVALID_CONFIG = ErrorCode.INVALID_CONFIG
+ERROR_CONNECTION_FAILED = ErrorCode.CONNECTION_FAILED
+ERROR_QUERY_FAILED = ErrorCode.QUERY_FAILED
+ERROR_EXECUTION_FAILED = ErrorCode.EXECUTION_FAILED
+ERROR_NOT_FOUND = ErrorCode.NOT_FOUND
+
+
+# --- Data Item Utilities ---
+# Helpers connectors use to fill the standard Data Item fields
+# (see docs/protocol/data_item_structure.md).
+
+def generate_item_id():
+    """Returns a new unique item_id (random UUID4 string) for a retrieved Data Item."""
+    return str(uuid.uuid4())
+
+def create_iso_timestamp():
+    """Returns the current UTC time as an ISO 8601 string, used for 'retrieved_at'."""
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
 
 
 # --- Security Considerations (Placeholders for PoC) ---
@@ -82,5 +114,3 @@ ERROR_NOT_FOUND = "NOT_FOUND"
 # - No network communication security implemented yet.
 # - No granular access control between agents and connectors yet.
 # - Input sanitization in agents/connectors is minimal.
-
-print("OmniNexus Protocol Definitions (PoC) - Loaded.") # Just to show file is read
\ No newline at end of file